@@ -0,0 +1,84 @@
+"""Seed the blog with many posts and time the index page.
+
+Run from the repository root:
+
+    python benchmarks/blog_index.py --posts 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flaskr import create_app
+from flaskr.db import get_db, init_db
+
+
+def seed(db, posts, authors=100, batch_size=50000):
+    """Insert authors and posts in large transactions, one post a minute apart."""
+    db.executemany(
+        'INSERT INTO user (username, password) VALUES (?, ?)',
+        ((f'user{i}', 'x') for i in range(authors))
+    )
+    start = datetime(2000, 1, 1)
+    for offset in range(0, posts, batch_size):
+        db.executemany(
+            'INSERT INTO post (author_id, created, title, body) VALUES (?, ?, ?, ?)',
+            (
+                (i % authors + 1, (start + timedelta(minutes=i)).isoformat(' '),
+                 f'Post {i}', 'Lorem ipsum ' * 20)
+                for i in range(offset, min(offset + batch_size, posts))
+            )
+        )
+        db.commit()
+
+
+def time_requests(client, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f'{label:<28} median {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'TESTING': True, 'DATABASE': os.path.join(tmp, 'bench.sqlite')})
+        with app.app_context():
+            init_db()
+            start = time.perf_counter()
+            seed(get_db(), args.posts)
+            print(f'Seeded {args.posts} posts in {time.perf_counter() - start:.1f} s')
+
+            # Cursor for a page far from the newest posts
+            middle = get_db().execute(
+                'SELECT created, id FROM post ORDER BY created DESC, id DESC'
+                ' LIMIT 1 OFFSET ?', (args.posts // 2,)
+            ).fetchone()
+
+        client = app.test_client()
+        report('first page', time_requests(client, '/', args.repeat))
+        deep_url = (f"/?before_created={middle['created'].isoformat(' ')}"
+                    f"&before_id={middle['id']}")
+        report(f'page at post {args.posts // 2}', time_requests(client, deep_url, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""Replay dashboard sessions against a running Dash server and report callback latency.
+
+Each session is what a visitor does in the browser: load the page, pick
+a statistic, then click a few neighbourhoods. The tool sends the same
+_dash-update-component requests the browser would, including callbacks
+chained off earlier outputs, and reports throughput plus p50/p95/p99
+latency and payload size per callback.
+
+Start the app under gunicorn, then run from the repository root:
+
+    gunicorn --chdir simple_website -w 4 -b 127.0.0.1:8000 wsgi:application
+    python benchmarks/dash_sessions.py --url http://127.0.0.1:8000 --users 16 --seconds 60
+
+Sessions are generated from the dropdown's statistics and
+toronto_map_data.geojson unless --sessions points at a JSON file;
+--save-sessions writes the generated ones out so they can be edited and
+replayed.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+GEOJSON_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'simple_website', 'toronto_map_data.geojson'
+)
+
+
+def generate_sessions(count, stats, clicks=4, seed=0, geojson_path=GEOJSON_PATH):
+    """Sessions of a page load, a statistic choice and some neighbourhood clicks.
+
+    Click events carry the same clickData the map sends: the neighbourhood
+    name as the location and its value of the chosen statistic as z.
+
+    Args:
+        count (int): Number of sessions.
+        stats (list): Statistics to choose from, as offered by the dropdown.
+        clicks (int): Neighbourhood clicks per session.
+    """
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        features = [feature['properties'] for feature in json.load(f)['features']]
+
+    rng = random.Random(seed)
+    sessions = []
+    for i in range(count):
+        stat = rng.choice(stats)
+        steps = [{'event': 'load'}, {'prop': 'statistic_dropdown.value', 'value': stat}]
+        for point_index in rng.sample(range(len(features)), clicks):
+            steps.append({'prop': 'map_graph.clickData', 'value': {'points': [{
+                'curveNumber': 0,
+                'pointNumber': point_index,
+                'pointIndex': point_index,
+                'location': features[point_index]['AREA_NAME'],
+                'z': features[point_index][stat],
+            }]}})
+        sessions.append({'name': f'session-{i}', 'steps': steps})
+    return sessions
+
+
+def _parse_outputs(output):
+    """Split a dependency's output string into its (id, property) pairs."""
+    multi = output.startswith('..') and output.endswith('..')
+    parts = output[2:-2].split('...') if multi else [output]
+    pairs = []
+    for part in parts:
+        component_id, prop = part.rsplit('.', 1)
+        pairs.append((component_id.replace('\\.', '.'), prop.split('@')[0]))
+    return pairs, multi
+
+
+def _initial_props(layout, props=None):
+    """Every prop of every component with an id in the layout, keyed by 'id.prop'."""
+    props = {} if props is None else props
+    if isinstance(layout, list):
+        for child in layout:
+            _initial_props(child, props)
+    elif isinstance(layout, dict) and 'props' in layout:
+        component_id = layout['props'].get('id')
+        for name, value in layout['props'].items():
+            if component_id is not None and isinstance(component_id, str):
+                props[f'{component_id}.{name}'] = value
+            _initial_props(value, props)
+    return props
+
+
+class DashClient:
+    """One simulated browser: a keep-alive connection and the current prop values."""
+
+    def __init__(self, url, dependencies, layout_props, timeout=60):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.dependencies = dependencies
+        self.props = dict(layout_props)
+        self.connection = None
+
+    def _post(self, body):
+        payload = json.dumps(body)
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(
+                    'POST', f'{self.prefix}/_dash-update-component', payload,
+                    {'Content-Type': 'application/json'}
+                )
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def _call(self, dependency, changed):
+        outputs, multi = _parse_outputs(dependency['output'])
+        described = [{'id': i, 'property': p} for i, p in outputs]
+        body = {
+            'output': dependency['output'],
+            'outputs': described if multi else described[0],
+            'inputs': [
+                {**item, 'value': self.props.get(f"{item['id']}.{item['property']}")}
+                for item in dependency['inputs']
+            ],
+            'changedPropIds': changed,
+            'state': [
+                {**item, 'value': self.props.get(f"{item['id']}.{item['property']}")}
+                for item in dependency.get('state', [])
+            ],
+        }
+        start = time.perf_counter()
+        status, data = self._post(body)
+        elapsed = time.perf_counter() - start
+
+        updated = []
+        if status == 200:
+            for component_id, values in json.loads(data).get('response', {}).items():
+                for prop, value in values.items():
+                    # Partial updates only make sense to a browser holding the figure
+                    if not (isinstance(value, dict) and '__dash_patch_update' in value):
+                        self.props[f'{component_id}.{prop}'] = value
+                    updated.append(f'{component_id}.{prop}')
+        label = ', '.join(f'{i}.{p}' for i, p in outputs)
+        return label, status, elapsed, len(data), updated
+
+    def trigger(self, changed, initial=False):
+        """Run every callback fired by the changed props, then any they fire in turn.
+
+        Returns:
+            list: (callback, status, seconds, bytes) for each request made.
+        """
+        results = []
+        done = set()
+        pending = list(changed)
+        while pending or initial:
+            prop_ids = set(pending)
+            pending = []
+            for dependency in self.dependencies:
+                if dependency['output'] in done or dependency.get('long'):
+                    continue
+                inputs = {f"{item['id']}.{item['property']}" for item in dependency['inputs']}
+                if initial:
+                    if dependency.get('prevent_initial_call'):
+                        continue
+                elif not inputs & prop_ids:
+                    continue
+                done.add(dependency['output'])
+                label, status, elapsed, size, updated = self._call(
+                    dependency, sorted(inputs & prop_ids) if not initial else []
+                )
+                results.append((label, status, elapsed, size))
+                pending.extend(updated)
+            initial = False
+        return results
+
+    def run_session(self, session):
+        results = []
+        for step in session['steps']:
+            if step.get('event') == 'load':
+                results.extend(self.trigger([], initial=True))
+            else:
+                self.props[step['prop']] = step['value']
+                results.extend(self.trigger([step['prop']]))
+        return results
+
+
+def _get_json(url, path):
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    connection.request('GET', parts.path.rstrip('/') + path)
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(f'GET {path} returned {response.status}')
+    return json.loads(data)
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def report(results, elapsed, sessions_done):
+    by_callback = defaultdict(list)
+    for label, status, seconds, size in results:
+        by_callback[label].append((status, seconds, size))
+
+    print(f'{sessions_done} sessions, {len(results)} requests in {elapsed:.1f} s: '
+          f'{len(results) / elapsed:.1f} requests/s, {sessions_done / elapsed:.2f} sessions/s')
+    print(f"{'callback':<60} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean KB':>8}")
+    for label, calls in sorted(by_callback.items()):
+        latencies = sorted(seconds * 1000 for _, seconds, _ in calls)
+        errors = sum(1 for status, _, _ in calls if status not in (200, 204))
+        mean_kb = statistics.mean(size for _, _, size in calls) / 1024
+        name = label if len(label) <= 60 else label[:57] + '...'
+        print(f'{name:<60} {len(calls):>6} {errors:>6} {percentile(latencies, 50):>8.1f} '
+              f'{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f} {mean_kb:>8.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=8, help='concurrent simulated visitors')
+    parser.add_argument('--seconds', type=float, default=30, help='how long to keep replaying')
+    parser.add_argument('--sessions', help='JSON file of recorded sessions to replay')
+    parser.add_argument('--save-sessions', help='write the generated sessions to this file and exit')
+    parser.add_argument('--clicks', type=int, default=4, help='clicks per generated session')
+    args = parser.parse_args()
+
+    dependencies = _get_json(args.url, '/_dash-dependencies')
+    layout_props = _initial_props(_get_json(args.url, '/_dash-layout'))
+
+    if args.sessions:
+        with open(args.sessions, 'r', encoding='utf-8') as f:
+            sessions = json.load(f)
+    else:
+        stats = [option['value'] for option in layout_props['statistic_dropdown.options']]
+        sessions = generate_sessions(max(50, args.users * 4), stats, args.clicks)
+    if args.save_sessions:
+        with open(args.save_sessions, 'w', encoding='utf-8') as f:
+            json.dump(sessions, f, indent=2)
+        print(f'Saved {len(sessions)} sessions to {args.save_sessions}')
+        return
+
+    results = []
+    lock = threading.Lock()
+    sessions_done = [0]
+    deadline = time.perf_counter() + args.seconds
+
+    def user(user_index):
+        client = DashClient(args.url, dependencies, layout_props)
+        i = user_index
+        while time.perf_counter() < deadline:
+            # Each session starts from a fresh page
+            client.props = dict(layout_props)
+            session_results = client.run_session(sessions[i % len(sessions)])
+            with lock:
+                results.extend(session_results)
+                sessions_done[0] += 1
+            i += args.users
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        for future in [pool.submit(user, u) for u in range(args.users)]:
+            future.result()
+    report(results, time.perf_counter() - start, sessions_done[0])
+
+
+if __name__ == '__main__':
+    main()
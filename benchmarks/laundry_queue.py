@@ -0,0 +1,106 @@
+"""Load-test the laundry request queue against a local SQLite database.
+
+Client threads enqueue machine requests through the Flask app while
+worker threads claim them, and the sustained rates of both are reported.
+Run from the repository root:
+
+    python benchmarks/laundry_queue.py --clients 32 --workers 4 --seconds 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flaskr import create_app
+from flaskr.db import get_db, init_db
+
+
+def client_loop(app, username, machines, stop, counts):
+    client = app.test_client()
+    client.post('/auth/register', data={'username': username, 'password': 'load'})
+    client.post('/auth/login', data={'username': username, 'password': 'load'})
+    sent = 0
+    while not stop.is_set():
+        machine = machines[sent % len(machines)]
+        response = client.post(f'/laundry/machines/{machine}/requests')
+        assert response.status_code == 201, response.status_code
+        sent += 1
+    counts[username] = sent
+
+
+def worker_loop(app, name, machines, stop, counts):
+    client = app.test_client()
+    claimed = 0
+    while not stop.is_set():
+        for machine in machines:
+            response = client.post(
+                f'/laundry/machines/{machine}/claim',
+                headers={'Authorization': f'Bearer token-{name}'}
+            )
+            if response.status_code == 200:
+                claimed += 1
+    counts[name] = claimed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--machines', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'TESTING': True,
+            'DATABASE': os.path.join(tmp, 'load.sqlite'),
+            # Cheap hashes, so registering the clients doesn't skew the run
+            'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'LAUNDRY_WORKER_TOKENS': {f'token-worker{i}': f'worker{i}' for i in range(args.workers)},
+        })
+        with app.app_context():
+            init_db()
+
+        machines = [f'machine-{i}' for i in range(args.machines)]
+        stop = threading.Event()
+        enqueued, claimed = {}, {}
+        threads = [
+            threading.Thread(target=client_loop, args=(app, f'client{i}', machines, stop, enqueued))
+            for i in range(args.clients)
+        ] + [
+            threading.Thread(target=worker_loop, args=(app, f'worker{i}', machines, stop, claimed))
+            for i in range(args.workers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        with app.app_context():
+            db = get_db()
+            total = db.execute('SELECT COUNT(*) FROM laundry_requests').fetchone()[0]
+            claimed_rows = db.execute(
+                'SELECT COUNT(*) FROM laundry_requests WHERE claimed IS NOT NULL'
+            ).fetchone()[0]
+            pending = db.execute(
+                'SELECT COUNT(*) FROM laundry_requests WHERE claimed IS NULL'
+            ).fetchone()[0]
+
+    print(f'{args.clients} clients, {args.workers} workers, {args.machines} machines, {elapsed:.1f} s')
+    print(f'enqueued {sum(enqueued.values()):>8}  ({sum(enqueued.values()) / elapsed:,.0f} requests/s)')
+    print(f'claimed  {sum(claimed.values()):>8}  ({sum(claimed.values()) / elapsed:,.0f} claims/s)')
+    # A request claimed twice would be counted by two workers but stored once
+    print(f'stored {total}, still pending {pending}, '
+          f'double claims {sum(claimed.values()) - claimed_rows}')
+
+
+if __name__ == '__main__':
+    main()
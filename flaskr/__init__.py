@@ -9,6 +9,19 @@ def create_app(test_config=None):
     app.config.from_mapping(
         SECRET_KEY='dev',
         DATABASE=os.path.join(app.instance_path, 'flaskr.sqlite'),
+        POSTS_PER_PAGE=20,
+        # werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+        PASSWORD_HASH_METHOD='scrypt:32768:8:1',
+        PASSWORD_HASH_WORKERS=2,
+        # seconds a login waits for a free hashing slot before getting a 503
+        PASSWORD_HASH_WAIT=0.5,
+        USER_CACHE_SIZE=1024,
+        USER_CACHE_TTL=60,
+        LAUNDRY_BATCH_SIZE=256,
+        LAUNDRY_BATCH_WAIT=0.005,
+        LAUNDRY_BATCH_TIMEOUT=5,
+        # bearer token -> worker name, for claiming laundry requests
+        LAUNDRY_WORKER_TOKENS={},
     )
 
     if test_config is None:
@@ -29,9 +42,10 @@ def create_app(test_config=None):
     def hello():
         return 'Hello, World!'
     
-    from . import db, auth, blog
+    from . import db, auth, blog, laundry
     db.init_app(app)
     app.register_blueprint(auth.bp)
     app.register_blueprint(blog.bp)
+    app.register_blueprint(laundry.bp)
     app.add_url_rule('/', endpoint='index')
     return app
\ No newline at end of file
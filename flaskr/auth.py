@@ -1,15 +1,76 @@
 import functools
+import threading
+import time
+from collections import OrderedDict
 
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, session, url_for
+    Blueprint, current_app, flash, g, redirect, render_template, request, session, url_for
 )
 
+from werkzeug.exceptions import abort
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from flaskr.db import get_db
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+# Recently loaded users keyed by (database, id), least recently used first.
+# Entries expire after USER_CACHE_TTL seconds so changes show up quickly.
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+_hash_slots_lock = threading.Lock()
+
+def _hash_slots():
+    # Hashing is deliberately slow, so only PASSWORD_HASH_WORKERS requests
+    # may hash at once; the rest wait briefly and are then turned away, so
+    # a burst of logins can't tie up every request thread
+    slots = current_app.extensions.get('password_hash_slots')
+    if slots is None:
+        with _hash_slots_lock:
+            slots = current_app.extensions.get('password_hash_slots')
+            if slots is None:
+                slots = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_WORKERS'])
+                current_app.extensions['password_hash_slots'] = slots
+    return slots
+
+def _run_hash(fn, *args):
+    slots = _hash_slots()
+    if not slots.acquire(timeout=current_app.config['PASSWORD_HASH_WAIT']):
+        abort(503, 'Too many logins at once, please try again.', retry_after=1)
+    try:
+        return fn(*args)
+    finally:
+        slots.release()
+
+def hash_password(password):
+    return _run_hash(
+        generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD']
+    )
+
+def verify_password(pwhash, password):
+    return _run_hash(check_password_hash, pwhash, password)
+
+def get_user(user_id):
+    """Return the id and username of a user, from the cache when possible."""
+    key = (current_app.config['DATABASE'], user_id)
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry = _user_cache.get(key)
+        if entry is not None and entry[0] > now:
+            _user_cache.move_to_end(key)
+            return entry[1]
+
+    user = get_db().execute(
+        'SELECT id, username FROM user WHERE id = ?', (user_id,)
+    ).fetchone()
+
+    with _user_cache_lock:
+        _user_cache[key] = (now + current_app.config['USER_CACHE_TTL'], user)
+        _user_cache.move_to_end(key)
+        while len(_user_cache) > current_app.config['USER_CACHE_SIZE']:
+            _user_cache.popitem(last=False)
+    return user
+
 @bp.route('/register', methods=('GET', 'POST'))
 def register():
     if request.method == 'POST':
@@ -27,7 +88,7 @@ def register():
             try:
                 db.execute(
                     "INSERT INTO user (username, password) VALUES (?, ?)",
-                    (username, generate_password_hash(password)),
+                    (username, hash_password(password)),
                 )
                 db.commit()
             except db.IntegrityError:
@@ -47,11 +108,11 @@ def login():
         db = get_db()
         error = None
         user = db.execute(
-            'SELECT * FROM user WHERE username = ?', (username,)
+            'SELECT id, password FROM user WHERE username = ?', (username,)
         ).fetchone()
         if user is None:
             error = 'Incorrect username.'
-        elif not check_password_hash(user['password'], password):
+        elif not verify_password(user['password'], password):
             error = 'Incorrect password'
         
         if error is None:
@@ -67,12 +128,11 @@ def login():
 def load_logged_in_user():
     user_id = session.get('user_id')
     
-    if user_id is None:
+    # Static files never need the user, so skip the lookup for them
+    if user_id is None or request.endpoint == 'static':
         g.user = None
     else:
-        g.user = get_db.execute(
-            'SELECT * FROM user WHERE id = ?', (user_id,)
-        ).fetchone()
+        g.user = get_user(user_id)
 
 @bp.route('/logout')
 def logout():
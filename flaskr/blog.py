@@ -1,5 +1,5 @@
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, url_for
+    Blueprint, current_app, flash, g, redirect, render_template, request, url_for
 )
 from werkzeug.exceptions import abort
 
@@ -10,13 +10,40 @@ bp = Blueprint('blog', __name__)
 
 @bp.route('/')
 def index():
+    # Keyset pagination: the page after a post is everything older than it,
+    # which the (created, id) index finds without scanning the newer posts
+    before_created = request.args.get('before_created')
+    before_id = request.args.get('before_id', type=int)
+    limit = current_app.config['POSTS_PER_PAGE']
+
     db = get_db()
-    posts = db.execute(
-        'SELECT p.id, title, body, created, author_id, username'
-        ' FROM post p JOIN user u ON p.author_id = u.id'
-        ' ORDER BY created DESC'
-    ).fetchall()
-    return render_template('blog/index.html', posts=posts)
+    if before_created is not None and before_id is not None:
+        posts = db.execute(
+            'SELECT p.id, title, body, created, author_id, username'
+            ' FROM post p JOIN user u ON p.author_id = u.id'
+            ' WHERE (created, p.id) < (?, ?)'
+            ' ORDER BY created DESC, p.id DESC LIMIT ?',
+            (before_created, before_id, limit + 1)
+        ).fetchall()
+    else:
+        posts = db.execute(
+            'SELECT p.id, title, body, created, author_id, username'
+            ' FROM post p JOIN user u ON p.author_id = u.id'
+            ' ORDER BY created DESC, p.id DESC LIMIT ?',
+            (limit + 1,)
+        ).fetchall()
+
+    # One extra row tells us whether there is an older page
+    next_page = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        last = posts[-1]
+        next_page = url_for(
+            'blog.index',
+            before_created=last['created'].isoformat(' '),
+            before_id=last['id']
+        )
+    return render_template('blog/index.html', posts=posts, next_page=next_page)
 
 @bp.route('/create', methods = ('GET','POST'))
 @login_required
@@ -53,4 +80,7 @@ def get_post(id, check_author=True):
     if post is None:
         abort(404, f"Post id {id} doesn't exist.")
         
-    if check_author and post['author_id'] != g.user['id']
\ No newline at end of file
+    if check_author and post['author_id'] != g.user['id']:
+        abort(403)
+        
+    return post
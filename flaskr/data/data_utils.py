@@ -2,6 +2,7 @@ import pandas as pd
 import os
 import requests
 import json
+from dash import html
 
 # Define the base URL for the City of Toronto CKAN API
 BASE_URL = "https://ckan0.cf.opendata.inter.prod-toronto.ca"
@@ -111,16 +112,21 @@ def process_package(package_id, data_dir="data"):
     
     return package_dir
 
-# Taken from https://dash.plotly.com/layout
+# Adapted from https://dash.plotly.com/layout
 
 def generate_table(dataframe, max_rows=10):
+    """
+    Build a static html.Table from the first max_rows rows of a DataFrame.
+    
+    Only the rows that are shown are converted, in one pass. For browsing
+    whole datasets, use the paginated table in simple_website/data_table.py.
+    """
+    rows = dataframe.head(max_rows).to_numpy().tolist()
     return html.Table([
         html.Thead(
             html.Tr([html.Th(col) for col in dataframe.columns])
         ),
         html.Tbody([
-            html.Tr([
-                html.Td(dataframe.iloc[i][col]) for col in dataframe.columns
-            ]) for i in range(min(len(dataframe), max_rows))
+            html.Tr([html.Td(value) for value in row]) for row in rows
         ])
-    ])
\ No newline at end of file
+    ])
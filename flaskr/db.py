@@ -1,41 +1,97 @@
+import os
 import sqlite3
+import threading
 from datetime import datetime
 
 import click
 from flask import current_app, g
 
+# Applied to every new connection, overridable with the SQLITE_PRAGMAS config
+# (which can also add others, e.g. foreign_keys).
+# WAL lets readers run alongside a writer, and with WAL, synchronous=NORMAL
+# is still crash-safe while skipping an fsync on every commit.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,  # negative means KiB, so about 64 MB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Connections are opened once per worker thread and database path, then
+# reused for every request that thread handles. Each is stored with the
+# identity of the file it opened, so a database that is deleted and
+# recreated gets a fresh connection instead of the unlinked file.
+_local = threading.local()
+
+def _file_id(database):
+    try:
+        stat = os.stat(database)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+def connect(database, pragmas=None):
+    """Open a connection to database with the performance pragmas applied."""
+    db = sqlite3.connect(
+        database,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+    )
+    db.row_factory = sqlite3.Row
+    settings = dict(DEFAULT_PRAGMAS)
+    settings.update(pragmas or {})
+    for name, value in settings.items():
+        db.execute(f'PRAGMA {name} = {value}')
+    return db
+
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect(
-            current_app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES,
-        )
-        g.db.row_factory = sqlite3.Row
-        
+        database = current_app.config['DATABASE']
+        connections = _local.__dict__.setdefault('connections', {})
+        db, file_id = connections.get(database, (None, None))
+        if db is not None and file_id != _file_id(database):
+            db.close()
+            db = None
+        if db is None:
+            db = connect(database, current_app.config.get('SQLITE_PRAGMAS'))
+            connections[database] = (db, _file_id(database))
+        g.db = db
+
     return g.db
 
 def close_db(e=None):
     db = g.pop('db', None)
-    
-    if db is not None:
+
+    if db is not None and db.in_transaction:
+        # The connection is kept for the next request on this thread, so
+        # don't let an unfinished transaction leak into it
+        db.rollback()
+
+def close_thread_connections():
+    """Close this thread's cached connections, e.g. before deleting the database."""
+    for db, _ in _local.__dict__.pop('connections', {}).values():
         db.close()
-        
+
 def init_db():
+    # Start from a fresh connection in case the file was replaced
+    g.pop('db', None)
+    close_thread_connections()
     db = get_db()
-    
+
     with current_app.open_resource('schema.sql') as f:
         db.executescript(f.read().decode('utf-8'))
-        
+
 @click.command('init-db')
 def init_db_command():
     """Clear the existing data and create new tables."""
     init_db()
     click.echo('Initialized the database.')
-    
+
 sqlite3.register_converter(
     "timestamp", lambda v: datetime.fromisoformat(v.decode())
 )
 
 def init_app(app):
     app.teardown_appcontext(close_db)
-    app.cli.add_command(init_db_command)
\ No newline at end of file
+    app.cli.add_command(init_db_command)
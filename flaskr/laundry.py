@@ -0,0 +1,188 @@
+import hmac
+import queue
+import threading
+import time
+
+from flask import Blueprint, current_app, g, jsonify, request
+from werkzeug.exceptions import abort
+
+from flaskr.auth import login_required
+from flaskr.db import connect, get_db
+
+bp = Blueprint('laundry', __name__, url_prefix='/laundry')
+
+class RequestBatcher:
+    """Coalesces machine requests from many threads into shared transactions.
+
+    Each commit costs a disk sync, so instead of one transaction per
+    request a single writer thread collects whatever arrives within
+    max_wait seconds (up to max_batch requests) and inserts it all at once.
+    Callers block until their row is committed, for at most timeout seconds.
+    """
+
+    def __init__(self, database, pragmas=None, max_batch=256, max_wait=0.005, timeout=5):
+        self.database = database
+        self.pragmas = pragmas
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name='laundry-batcher', daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, user_id, machine_id):
+        """Queue a request and return its id once it has been committed.
+
+        Raises TimeoutError if the writer doesn't get to it within timeout
+        seconds; the request may still be committed later.
+        """
+        slot = {'done': threading.Event()}
+        self._queue.put((user_id, machine_id, slot))
+        if not slot['done'].wait(self.timeout):
+            raise TimeoutError('The laundry request was not committed in time.')
+        if 'error' in slot:
+            raise slot['error']
+        return slot['id']
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, db, batch):
+        with db:
+            return [
+                db.execute(
+                    'INSERT INTO laundry_requests (user_id, machine_id)'
+                    ' VALUES (?, ?) RETURNING id',
+                    (user_id, machine_id)
+                ).fetchone()[0]
+                for user_id, machine_id, _ in batch
+            ]
+
+    def _run(self):
+        db = None
+        while True:
+            batch = self._collect()
+            try:
+                if db is None:
+                    db = connect(self.database, self.pragmas)
+                for (_, _, slot), request_id in zip(batch, self._insert(db, batch)):
+                    slot['id'] = request_id
+            except Exception as e:
+                if db is not None and len(batch) > 1:
+                    # One bad row rolls back the whole batch, so retry each
+                    # row on its own and only fail the ones that are bad
+                    for row in batch:
+                        try:
+                            row[2]['id'] = self._insert(db, [row])[0]
+                        except Exception as row_error:
+                            row[2]['error'] = row_error
+                else:
+                    for _, _, slot in batch:
+                        slot['error'] = e
+                if db is not None and all('error' in slot for _, _, slot in batch):
+                    # Nothing got through; reopen the connection for the
+                    # next batch in case it was the problem
+                    db.close()
+                    db = None
+            for _, _, slot in batch:
+                slot['done'].set()
+
+_batcher_lock = threading.Lock()
+
+def get_batcher():
+    batcher = current_app.extensions.get('laundry_batcher')
+    if batcher is None:
+        with _batcher_lock:
+            batcher = current_app.extensions.get('laundry_batcher')
+            if batcher is None:
+                batcher = RequestBatcher(
+                    current_app.config['DATABASE'],
+                    current_app.config.get('SQLITE_PRAGMAS'),
+                    max_batch=current_app.config['LAUNDRY_BATCH_SIZE'],
+                    max_wait=current_app.config['LAUNDRY_BATCH_WAIT'],
+                    timeout=current_app.config['LAUNDRY_BATCH_TIMEOUT'],
+                )
+                current_app.extensions['laundry_batcher'] = batcher
+    return batcher
+
+def claim_request(machine_id, worker):
+    """Claim the oldest unclaimed request for a machine, or return None.
+
+    The pick and the update are one statement, and SQLite runs one writer
+    at a time, so two workers can never claim the same request.
+    """
+    db = get_db()
+    claimed = db.execute(
+        'UPDATE laundry_requests SET claimed = CURRENT_TIMESTAMP, claimed_by = ?'
+        ' WHERE id = ('
+        '  SELECT id FROM laundry_requests'
+        '  WHERE machine_id = ? AND claimed IS NULL'
+        '  ORDER BY created, id LIMIT 1'
+        ' ) AND claimed IS NULL'
+        ' RETURNING id, user_id, machine_id, created',
+        (worker, machine_id)
+    ).fetchone()
+    db.commit()
+    return claimed
+
+def queue_depth(machine_id):
+    return get_db().execute(
+        'SELECT COUNT(*) FROM laundry_requests'
+        ' WHERE machine_id = ? AND claimed IS NULL',
+        (machine_id,)
+    ).fetchone()[0]
+
+def authenticated_worker():
+    """The worker named by the request's bearer token, or None.
+
+    Tokens are configured in LAUNDRY_WORKER_TOKENS, mapping each token to
+    the worker name it claims requests as.
+    """
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    for known, worker in current_app.config['LAUNDRY_WORKER_TOKENS'].items():
+        if hmac.compare_digest(known.encode(), token.encode()):
+            return worker
+    return None
+
+@bp.route('/machines/<machine_id>/requests', methods=('POST',))
+@login_required
+def create_request(machine_id):
+    try:
+        request_id = get_batcher().submit(g.user['id'], machine_id)
+    except TimeoutError:
+        abort(503, 'The request queue is busy, please try again.', retry_after=1)
+    return jsonify(id=request_id, machine_id=machine_id), 201
+
+@bp.route('/machines/<machine_id>/claim', methods=('POST',))
+def claim(machine_id):
+    worker = authenticated_worker()
+    if worker is None:
+        abort(401, 'A valid worker token is required.')
+
+    claimed = claim_request(machine_id, worker)
+    if claimed is None:
+        return '', 204
+    return jsonify(
+        id=claimed['id'],
+        user_id=claimed['user_id'],
+        machine_id=claimed['machine_id'],
+        created=claimed['created'].isoformat(' '),
+    )
+
+@bp.route('/machines/<machine_id>/depth')
+def depth(machine_id):
+    return jsonify(machine_id=machine_id, depth=queue_depth(machine_id))
@@ -1,6 +1,7 @@
-DROP TABLE IF EXISTS user;
-DROP TABLE IF EXISTS post;
+-- Children before user, so foreign keys don't block the drops
 DROP TABLE IF EXISTS laundry_requests;
+DROP TABLE IF EXISTS post;
+DROP TABLE IF EXISTS user;
 
 CREATE TABLE user (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -17,10 +18,20 @@ CREATE TABLE post (
     FOREIGN KEY (author_id) REFERENCES user (id)
 );
 
+-- Newest-first listing on the index page, and posts by author
+CREATE INDEX post_created_idx ON post (created DESC, id DESC);
+CREATE INDEX post_author_idx ON post (author_id);
+
 CREATE TABLE laundry_requests (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
     created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     machine_id TEXT NOT NULL,
+    claimed TIMESTAMP,
+    claimed_by TEXT,
     FOREIGN KEY (user_id) REFERENCES user (id)
-);
\ No newline at end of file
+);
+
+-- Pending requests per machine, oldest first, for claims and queue depth
+CREATE INDEX laundry_requests_queue_idx
+    ON laundry_requests (machine_id, created, id) WHERE claimed IS NULL;
\ No newline at end of file
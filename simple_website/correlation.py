@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# Correlation matrices keyed by (data version, method)
+_correlation_cache = {}
+
+
+def pairwise_pearson(values):
+    """Pearson correlation between every pair of columns, ignoring NaNs.
+
+    Each pair uses only the rows where both columns are present. All the
+    sums involved come from a handful of matrix products, so the whole
+    matrix is computed in one pass instead of once per pair.
+
+    Args:
+        values (np.ndarray): (n_rows, n_columns) array, NaN for missing.
+
+    Returns:
+        np.ndarray: (n_columns, n_columns) correlation matrix. Pairs with
+            fewer than two shared rows or no variance are NaN.
+    """
+    mask = ~np.isnan(values)
+    present = mask.astype(float)
+    # Centre each column first: the sums below subtract large, nearly equal
+    # terms, which loses precision when a column's mean dwarfs its spread.
+    # All-missing columns are centred on 0 to avoid an empty-mean warning.
+    centre = np.nanmean(np.where(mask.any(axis=0), values, 0.0), axis=0)
+    x = np.where(mask, values - centre, 0.0)
+
+    # counts[i, j] is the number of rows where columns i and j both exist,
+    # sums[i, j] the sum of column i over those rows
+    counts = present.T @ present
+    sums = x.T @ present
+    sums_sq = (x * x).T @ present
+    cross = x.T @ x
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = cross - sums * sums.T / counts
+        var = sums_sq - sums ** 2 / counts
+        corr = cov / np.sqrt(var * var.T)
+    corr[counts < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def pairwise_spearman(values):
+    """Spearman rank correlation between every pair of columns, ignoring NaNs.
+
+    Columns are ranked once (ties get their average rank) and the ranks go
+    through pairwise_pearson. Ranks are taken over each column's own
+    non-missing rows, so with missing data this is an approximation.
+    """
+    ranks = pd.DataFrame(values).rank(method='average').to_numpy(dtype=float)
+    return pairwise_pearson(ranks)
+
+
+def correlation_matrix(frame, method='pearson', version=None):
+    """Correlation matrix between the columns of a frame, cached per data version.
+
+    Args:
+        frame (pd.DataFrame): One column per statistic.
+        method (str): 'pearson' or 'spearman'.
+        version (str): Identifies the data in frame. When given, the result
+            is cached and reused until the version changes.
+
+    Returns:
+        pd.DataFrame: Square correlation matrix labelled by frame's columns.
+    """
+    key = (version, method, tuple(frame.columns))
+    if version is not None and key in _correlation_cache:
+        return _correlation_cache[key]
+
+    values = frame.to_numpy(dtype=float)
+    if method == 'pearson':
+        corr = pairwise_pearson(values)
+    elif method == 'spearman':
+        corr = pairwise_spearman(values)
+    else:
+        raise ValueError(f"Unknown correlation method {method!r}.")
+
+    result = pd.DataFrame(corr, index=frame.columns, columns=frame.columns)
+    if version is not None:
+        # Drop entries for older versions of the data
+        for stale in [k for k in _correlation_cache if k[0] != version]:
+            del _correlation_cache[stale]
+        _correlation_cache[key] = result
+    return result
@@ -0,0 +1,164 @@
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path(__file__).parent.parent / 'flaskr' / 'data'
+MAP_DATA_PATH = Path(__file__).parent / 'toronto_map_data.geojson'
+
+# Dash DataTable filter operators -> the comparison they stand for
+FILTER_OPERATORS = {
+    '=': 'eq', 'eq': 'eq',
+    '!=': 'ne', 'ne': 'ne',
+    '<': 'lt', 'lt': 'lt',
+    '<=': 'le', 'le': 'le',
+    '>': 'gt', 'gt': 'gt',
+    '>=': 'ge', 'ge': 'ge',
+    'contains': 'contains',
+    'datestartswith': 'datestartswith',
+}
+FILTER_PART = re.compile(r'^\{(?P<column>.+?)\}\s+(?P<operator>\S+)\s+(?P<value>.+)$')
+
+
+def list_datasets(data_dir=DATA_DIR):
+    """Tabular files that can be browsed, labelled by their path under data_dir.
+
+    Picks up the profile JSON exports and any CSV resources saved by
+    data_utils.process_package, plus the dashboard's own map data.
+    """
+    data_dir = Path(data_dir)
+    datasets = {'Dashboard map data': MAP_DATA_PATH}
+    for path in sorted(data_dir.rglob('*')):
+        if path.suffix == '.csv' or (path.suffix == '.json' and path.name != 'metadata.json'):
+            datasets[str(path.relative_to(data_dir))] = path
+    return datasets
+
+
+def _read(path):
+    path = Path(path)
+    if path.suffix == '.csv':
+        return pd.read_csv(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and data.get('type') == 'FeatureCollection':
+        # Geometry isn't useful in a table, keep the properties
+        return pd.DataFrame.from_records([f['properties'] for f in data['features']])
+    return pd.DataFrame.from_records(data)
+
+
+@lru_cache(maxsize=8)
+def _load(path, mtime_ns):
+    return _read(path)
+
+
+def load_dataset(path):
+    """Load a dataset, reusing the parsed frame until the file changes."""
+    path = Path(path)
+    return _load(path, path.stat().st_mtime_ns)
+
+
+def parse_filter(filter_query):
+    """Split a DataTable filter_query into (column, operator, value, case_sensitive) parts.
+
+    Parts that can't be parsed are skipped rather than failing the page.
+    """
+    parts = []
+    for part in filter_query.split(' && ') if filter_query else []:
+        match = FILTER_PART.match(part.strip())
+        if not match:
+            continue
+        operator = match['operator']
+        case_sensitive = True
+        if operator[0] in 'si' and operator[1:] in FILTER_OPERATORS:
+            case_sensitive = operator[0] == 's'
+            operator = operator[1:]
+        if operator not in FILTER_OPERATORS:
+            continue
+
+        value = match['value'].strip()
+        if value[0] == value[-1] and value[0] in '\'"`' and len(value) > 1:
+            value = value[1:-1].replace('\\' + value[0], value[0])
+        else:
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        parts.append((match['column'], FILTER_OPERATORS[operator], value, case_sensitive))
+    return parts
+
+
+def _filter_mask(frame, parts):
+    mask = np.ones(len(frame), dtype=bool)
+    for column, operator, value, case_sensitive in parts:
+        if column not in frame.columns:
+            continue
+        series = frame[column]
+        if operator in ('contains', 'datestartswith'):
+            text = series.astype(str)
+            value = str(value)
+            if operator == 'contains':
+                condition = text.str.contains(value, case=case_sensitive, regex=False)
+            else:
+                condition = text.str.startswith(value)
+        else:
+            if isinstance(value, float) and not pd.api.types.is_numeric_dtype(series):
+                series = pd.to_numeric(series, errors='coerce')
+            elif isinstance(value, str) and pd.api.types.is_numeric_dtype(series):
+                series = series.astype(str)
+            if isinstance(value, str) and not case_sensitive:
+                series = series.str.lower()
+                value = value.lower()
+            condition = getattr(series, operator)(value)
+        mask &= condition.fillna(False).to_numpy(dtype=bool)
+    return mask
+
+
+@lru_cache(maxsize=32)
+def _row_order(path, mtime_ns, filter_query, sort_key):
+    """Positions of the filtered rows in sort order, cached so paging is a slice."""
+    frame = _load(path, mtime_ns)
+    positions = np.flatnonzero(_filter_mask(frame, parse_filter(filter_query)))
+    if sort_key:
+        columns = [column for column, _ in sort_key]
+        ascending = [direction == 'asc' for _, direction in sort_key]
+        order = frame.iloc[positions].reset_index(drop=True).sort_values(
+            columns, ascending=ascending, kind='stable', na_position='last'
+        ).index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def query_page(path, page_current=0, page_size=20, sort_by=None, filter_query=''):
+    """One page of a dataset, filtered and sorted on the server.
+
+    Args:
+        path (Path): Dataset file, one of list_datasets()'s values.
+        page_current (int): Zero-based page number.
+        page_size (int): Rows per page.
+        sort_by (list): DataTable sort_by, dicts with 'column_id' and 'direction'.
+        filter_query (str): DataTable filter_query.
+
+    Returns:
+        tuple: (records for the page, total number of pages, page number).
+            The page number is clamped to the last page, since a new filter
+            can leave fewer pages than the one being viewed.
+    """
+    path = Path(path)
+    frame = load_dataset(path)
+    sort_key = tuple(
+        (sort['column_id'], sort['direction'])
+        for sort in sort_by or []
+        if sort['column_id'] in frame.columns
+    )
+    positions = _row_order(path, path.stat().st_mtime_ns, filter_query or '', sort_key)
+
+    page_count = max(1, -(-len(positions) // page_size))
+    page_current = min(page_current, page_count - 1)
+    start = page_current * page_size
+    page = frame.iloc[positions[start:start + page_size]]
+    # NaN isn't valid JSON, send missing values as blanks
+    records = page.astype(object).where(page.notna(), None).to_dict('records')
+    return records, page_count, page_current
@@ -0,0 +1,98 @@
+import os
+import time
+import uuid
+from pathlib import Path
+
+import diskcache
+import psutil
+from dash import DiskcacheManager
+
+# Shared by every gunicorn worker and job process on this machine
+JOBS_CACHE_DIR = Path(__file__).parent / '.jobs_cache'
+RESULT_TTL = 24 * 60 * 60
+
+cache = diskcache.Cache(JOBS_CACHE_DIR)
+background_callback_manager = DiskcacheManager(cache)
+
+_MISSING = object()
+
+
+def _owner_alive(owner):
+    # owner is (pid, token). A killed job process that nobody has reaped yet
+    # is a zombie, which still "exists" but will never finish the job.
+    if owner is None:
+        return False
+    try:
+        return psutil.Process(owner[0]).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+def run_deduplicated(key, fn, *args, progress=None, poll=0.2, stall_timeout=60):
+    """Run fn(*args) once for a key, however many callers ask at the same time.
+
+    The first caller claims the key and runs the job; anyone else asking for
+    the same key waits for that result instead of starting a duplicate, and
+    sees the same progress. Results are kept for RESULT_TTL seconds, so
+    repeating a finished job is instant. If the running job is cancelled,
+    its process dies, or it reports no progress for stall_timeout seconds,
+    a waiting caller takes over.
+
+    Args:
+        key (tuple): Identifies the job, e.g. (name, data version, inputs).
+        fn (callable): Does the work. It gets a progress(done, total)
+            callable as its last argument.
+        progress (callable): Optional progress(done, total) to report to.
+        poll (float): Seconds between checks while waiting on another caller.
+        stall_timeout (float): Seconds without progress from the running
+            job before a waiting caller gives up on it and runs it itself.
+
+    Returns:
+        The result of fn(*args).
+    """
+    result_key = ('result',) + tuple(key)
+    owner_key = ('running',) + tuple(key)
+    progress_key = ('progress',) + tuple(key)
+
+    while True:
+        result = cache.get(result_key, default=_MISSING)
+        if result is not _MISSING:
+            return result
+
+        me = (os.getpid(), uuid.uuid4().hex)
+        if cache.add(owner_key, me, expire=RESULT_TTL):
+            def report(done, total):
+                cache.set(progress_key, (done, total), expire=RESULT_TTL)
+                if progress is not None:
+                    progress(done, total)
+            try:
+                result = fn(*args, report)
+                cache.set(result_key, result, expire=RESULT_TTL)
+                return result
+            finally:
+                with cache.transact():
+                    if cache.get(owner_key) == me:
+                        cache.delete(owner_key)
+                        cache.delete(progress_key)
+
+        # Someone else is running it: follow along until they finish, die
+        # or stop making progress
+        owner = cache.get(owner_key)
+        seen = cache.get(progress_key)
+        last_change = time.monotonic()
+        while _owner_alive(owner) and cache.get(owner_key) == owner:
+            shared = cache.get(progress_key)
+            if shared != seen:
+                seen = shared
+                last_change = time.monotonic()
+            elif time.monotonic() - last_change > stall_timeout:
+                break
+            if shared is not None and progress is not None:
+                progress(*shared)
+            time.sleep(poll)
+        # A cancelled or stalled job's key is left behind, so clear it (if
+        # nobody else has yet) before trying again
+        with cache.transact():
+            if owner is not None and cache.get(owner_key) == owner:
+                cache.delete(owner_key)
+                cache.delete(progress_key)
@@ -0,0 +1,18 @@
+# Statistics in toronto_map_data.geojson offered on the dashboard, shared by
+# the app and the snapshot CLI. The file's confidence interval columns are
+# left out: they aren't statistics to map on their own.
+STATISTICS = [
+    'Median Age',
+    'Median Total Income',
+    'Percent Deemed Low-Income',
+    'Average Family Size',
+    'Total # of People with Diabetes, age 20+',
+    'Total population 2022',
+    'Total population 2023',
+    'Age-Standardized Diabetes Rate',
+    'Total Diabetes Prevalence',
+    'Number of People with Mental-Health-Related Visits',
+    'Age-Standardized Mental Health Visitation Rate',
+    'Number of Hospitalizations',
+    'Age-Standardized Annual Hospitalization Rate (per 100 people)'
+]
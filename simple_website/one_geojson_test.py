@@ -1,37 +1,38 @@
-from dash import Dash, dcc, html, Input, Output
+from dash import Dash, dcc, html, dash_table, Input, Output, State, Patch, ALL, ctx, no_update
+from flask import Response, abort, request, send_file
 from pathlib import Path
 import geopandas as gpd
 import plotly.express as px
+import plotly.graph_objects as go
 from plotly.figure_factory import create_distplot
 import dash_bootstrap_components as dbc
 from scipy.stats import percentileofscore
 
+from correlation import correlation_matrix
+from data_table import list_datasets, load_dataset, query_page
+from jobs import background_callback_manager, run_deduplicated
+from map_statistics import STATISTICS
+from search import build_index, collect_entries, search
+from similarity import build_similarity_index
+from snapshots import CMAPS, FORMATS, data_version as file_version, pooled_snapshot
+from spatial import contiguity_weights, morans_i
+from tiles import MAX_ZOOM, get_tile, tiles_version, vector_tile_layer
+from timeseries import load_or_build_store, year_frames
+
 # Path to your single GeoJSON file containing all neighbourhoods and statistics
 geojson_path = Path(__file__).parent / 'toronto_map_data.geojson'
 
 # Load the master GeoDataFrame
 gdf = gpd.read_file(geojson_path)
+# Changes whenever the data file does, used to key cached results
+data_version = file_version(geojson_path)
 # Ensure CRS is WGS84 (EPSG:4326)
 if gdf.crs is None or gdf.crs.to_epsg() != 4326:
     gdf = gdf.to_crs(epsg=4326)
 
 colors = ['green']
-# List of statistics available in the GeoJSON properties
-statistics = [
-    'Median Age',
-    'Median Total Income',
-    'Percent Deemed Low-Income',
-    'Average Family Size',
-    'Total # of People with Diabetes, age 20+',
-    'Total population 2022',
-    'Total population 2023',
-    'Age-Standardized Diabetes Rate',
-    'Total Diabetes Prevalence',
-    'Number of People with Mental-Health-Related Visits',
-    'Age-Standardized Mental Health Visitation Rate',
-    'Number of Hospitalizations',
-    'Age-Standardized Annual Hospitalization Rate (per 100 people)'
-]
+# Statistics available in the GeoJSON properties
+statistics = STATISTICS
 
 # Compute global min/max for each statistic
 stat_ranges = {
@@ -42,12 +43,112 @@ stat_ranges = {
     for stat in statistics
 }
 
+# Neighbourhood x statistic matrix shared by the correlation views
+stat_frame = gdf[statistics].astype(float)
+stat_matrix = stat_frame.to_numpy()
+stat_index = {stat: i for i, stat in enumerate(statistics)}
+
+# Precompute each neighbourhood's closest matches across the dashboard's
+# statistics, so a map click only needs a lookup. The confidence interval
+# columns are left out, since they would count diabetes several times over.
+SIMILAR_K = 5
+similar_neighbourhoods = build_similarity_index(
+    stat_frame.set_axis(gdf['AREA_NAME']), k=SIMILAR_K
+)
+
+# Values for every census year on the current 158 boundaries. Each year is
+# kept as a ready-to-send list so the year slider only swaps the values.
+timeseries_store = load_or_build_store(gdf, geojson_path)
+timeseries_frames = {
+    attribute: year_frames(timeseries_store, attribute, gdf['AREA_NAME'].tolist())
+    for attribute in timeseries_store['attributes']
+}
+timeseries_ranges = {
+    attribute: {
+        'min': min(v for values in frames.values() for v in values if v is not None),
+        'max': max(v for values in frames.values() for v in values if v is not None)
+    }
+    for attribute, frames in timeseries_frames.items()
+}
+timeseries_years = timeseries_store['years']
+
+# Full-text index over the statistics, profile attributes and CKAN metadata.
+# Statistics back the typeahead in the statistic dropdown; everything else
+# is searched from the Data Browser.
+search_index = build_index(collect_entries(statistics))
+STATISTIC_OPTIONS_LIMIT = 50
+DATA_SEARCH_KINDS = ('attribute', 'package', 'resource')
+DATA_SEARCH_LIMIT = 20
+
+# Neighbour weights for the spatial statistics jobs
+spatial_weights = contiguity_weights(gdf)
+MORAN_PERMUTATIONS = 99999
+
+# Raw data files that can be browsed in the data table
+datasets = list_datasets()
+TABLE_PAGE_SIZE = 20
+# Profile attributes are indexed by file name; this finds their dataset
+dataset_by_file = {path.name: name for name, path in datasets.items()}
+
 # Centre of Toronto for map
 centre_lat, centre_lon = 43.6532, -79.3832
 
 # Initialise Dash app
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+app = Dash(
+    __name__,
+    external_stylesheets=[dbc.themes.BOOTSTRAP],
+    # Long jobs run in separate processes so they don't hold up a worker
+    background_callback_manager=background_callback_manager
+)
 server = app.server
+
+# Serve the neighbourhood vector tiles (see tiles.py), so the map only
+# fetches the boundaries in view at the current zoom
+TILE_MAX_AGE = 24 * 60 * 60
+
+@server.route('/tiles/<int:z>/<int:x>/<int:y>.pbf')
+def serve_tile(z, x, y):
+    if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        abort(404)
+    data = get_tile(z, x, y)
+    if data is None:
+        # Nothing to draw here at any zoom, so nothing worth retrying
+        response = Response(status=204)
+    else:
+        response = Response(data, mimetype='application/vnd.mapbox-vector-tile')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(f'{tiles_version()}-{z}-{x}-{y}')
+    response.cache_control.public = True
+    response.cache_control.max_age = TILE_MAX_AGE
+    return response.make_conditional(request)
+
+# Static choropleth images for reports and embeds, e.g.
+# /snapshots/map.png?stat=Median%20Age&cmap=magma. Each image is rendered
+# once per data version and style in the snapshot process pool, then served
+# from the snapshot cache.
+SNAPSHOT_MAX_AGE = 24 * 60 * 60
+SNAPSHOT_RENDER_TIMEOUT = 30
+
+@server.route('/snapshots/map.<fmt>')
+def serve_snapshot(fmt):
+    selected_stat = request.args.get('stat', statistics[0])
+    cmap = request.args.get('cmap', CMAPS[0])
+    if fmt not in FORMATS or selected_stat not in statistics or cmap not in CMAPS:
+        abort(404)
+    path = pooled_snapshot(
+        data_version, selected_stat, fmt, {'cmap': cmap}, timeout=SNAPSHOT_RENDER_TIMEOUT
+    )
+    if path is None:
+        # Still rendering; it will be in the cache for the retry
+        abort(503, 'The snapshot is still being rendered.', retry_after=5)
+    response = send_file(path, mimetype=FORMATS[fmt], etag=path.stem, max_age=SNAPSHOT_MAX_AGE)
+    return response.make_conditional(request)
+
+def boundary_layers(layer_names):
+    # Tile URLs must be absolute, as the map fetches them from a web worker
+    url = request.host_url.rstrip('/') + '/tiles/{z}/{x}/{y}.pbf'
+    return [vector_tile_layer(url, name) for name in layer_names]
+
 # Layout with DBC components
 app.layout = dbc.Container([
     # Header
@@ -76,6 +177,15 @@ app.layout = dbc.Container([
                 ],
                 value=statistics[0],
                 className='statistic-dropdown'
+            ),
+            dcc.Checklist(
+                id='boundary_layers',
+                options=[
+                    {'label': ' Show historical 140-neighbourhood boundaries',
+                     'value': 'neighbourhoods_140'}
+                ],
+                value=[],
+                className='mt-2 text-center'
             )
         ], width=6)
     ], className='mb-4 justify-content-center'),
@@ -108,19 +218,187 @@ app.layout = dbc.Container([
                         className='percentile-text',
                         style={'margin-bottom': '1rem'}
                     ),
+                    html.Div(
+                        id='similar_text',
+                        className='similar-text'
+                    ),
                     dcc.Graph(id='dist_graph', className='graph-container full-height-graph', style={'height': '100%'})
                 ])
             ], className='full-height-card')
         ], width=6)
     ]),
+
+    # Correlation matrix and pairwise scatter side by side
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader("Correlation Between Statistics",
+                               className='graph-title text-center'),
+                dbc.CardBody([
+                    dcc.RadioItems(
+                        id='correlation_method',
+                        options=[
+                            {'label': ' Pearson', 'value': 'pearson'},
+                            {'label': ' Spearman', 'value': 'spearman'}
+                        ],
+                        value='pearson',
+                        inline=True,
+                        inputStyle={'margin-left': '1rem'},
+                        className='text-center'
+                    ),
+                    dcc.Graph(id='correlation_graph', className='graph-container full-height-graph', style={'height': '100%'})
+                ])
+            ], className='full-height-card')
+        ], width=6),
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader("Compare Two Statistics",
+                               className='graph-title text-center'),
+                dbc.CardBody([
+                    html.Div(
+                        id='scatter_text',
+                        className='percentile-text',
+                        style={'margin-bottom': '1rem'}
+                    ),
+                    dcc.Graph(id='scatter_graph', className='graph-container full-height-graph', style={'height': '100%'})
+                ])
+            ], className='full-height-card')
+        ], width=6)
+    ], className='mt-4'),
+
+    # Census values over time
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader("Change Over Time",
+                               className='map-title text-center'),
+                dbc.CardBody([
+                    dcc.Dropdown(
+                        id='timeseries_attribute',
+                        options=[
+                            {'label': attribute, 'value': attribute}
+                            for attribute in timeseries_store['attributes']
+                        ],
+                        value=timeseries_store['attributes'][0],
+                        clearable=False,
+                        className='statistic-dropdown mb-3'
+                    ),
+                    dcc.Graph(
+                        id='timeseries_graph',
+                        config={'scrollZoom': True},
+                        className='map-container full-height-graph',
+                        style={'height': '100%'}
+                    ),
+                    dcc.Slider(
+                        id='year_slider',
+                        min=timeseries_years[0],
+                        max=timeseries_years[-1],
+                        step=None,
+                        marks={year: str(year) for year in timeseries_years},
+                        value=timeseries_years[-1]
+                    )
+                ])
+            ], className='full-height-card')
+        ], width=12)
+    ], className='mt-4 mb-4'),
+
+    # Spatial statistics, computed as a background job
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader("Spatial Autocorrelation",
+                               className='graph-title text-center'),
+                dbc.CardBody([
+                    html.P(
+                        "Do neighbouring neighbourhoods have similar values of "
+                        "the selected statistic? Runs a Moran's I permutation test.",
+                        className='text-center'
+                    ),
+                    html.Div([
+                        dbc.Button('Run', id='spatial_run', color='success', className='me-2'),
+                        dbc.Button('Cancel', id='spatial_cancel', color='secondary', disabled=True)
+                    ], className='text-center mb-3'),
+                    dbc.Progress(id='spatial_progress', value=0, max=MORAN_PERMUTATIONS, className='mb-3'),
+                    html.Div(id='spatial_text', className='percentile-text')
+                ])
+            ])
+        ], width=12)
+    ], className='mb-4'),
+
+    # Raw data browser, paged, sorted and filtered on the server
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader("Data Browser",
+                               className='graph-title text-center'),
+                dbc.CardBody([
+                    dcc.Input(
+                        id='data_search',
+                        type='search',
+                        debounce=True,
+                        placeholder='Search profile attributes and open data packages',
+                        className='form-control mb-2'
+                    ),
+                    html.Div(id='data_search_results', className='search-results mb-3'),
+                    dcc.Dropdown(
+                        id='dataset_dropdown',
+                        options=[{'label': name, 'value': name} for name in datasets],
+                        value=next(iter(datasets)),
+                        clearable=False,
+                        className='statistic-dropdown mb-3'
+                    ),
+                    dash_table.DataTable(
+                        id='data_table',
+                        page_current=0,
+                        page_size=TABLE_PAGE_SIZE,
+                        page_action='custom',
+                        sort_action='custom',
+                        sort_mode='multi',
+                        sort_by=[],
+                        filter_action='custom',
+                        filter_query='',
+                        style_table={'overflowX': 'auto'},
+                        style_cell={'textAlign': 'left', 'maxWidth': '300px',
+                                    'overflow': 'hidden', 'textOverflow': 'ellipsis'}
+                    )
+                ])
+            ])
+        ], width=12)
+    ], className='mb-4'),
 ], fluid=True)
 
+# Callback to fill the statistic dropdown from the search index as the user types
+@app.callback(
+    Output('statistic_dropdown', 'options'),
+    [Input('statistic_dropdown', 'search_value')],
+    [State('statistic_dropdown', 'value')]
+)
+def update_statistic_options(search_value, selected_stat):
+    if not search_value:
+        matches = statistics[:STATISTIC_OPTIONS_LIMIT]
+    else:
+        matches = [
+            result['key'] for result in
+            search(search_index, search_value, kind='statistic', limit=STATISTIC_OPTIONS_LIMIT)
+        ]
+    # The dropdown also filters options in the browser, so give each match the
+    # typed text to search on; the index has already done the matching
+    options = [
+        {'label': stat, 'value': stat, 'search': f'{stat} {search_value or ""}'}
+        for stat in matches
+    ]
+    # Keep the current choice so the dropdown doesn't clear while searching
+    if selected_stat and selected_stat not in matches:
+        options.append({'label': selected_stat, 'value': selected_stat})
+    return options
+
 # Callback to update map based on selected statistic
 @app.callback(
     Output('map_graph', 'figure'),
-    [Input('statistic_dropdown', 'value')]
+    [Input('statistic_dropdown', 'value')],
+    [State('boundary_layers', 'value')]
 )
-def update_map(selected_stat):
+def update_map(selected_stat, layer_names):
     zmin = stat_ranges[selected_stat]['min']
     zmax = stat_ranges[selected_stat]['max']
     # Custom colorblind-friendly sequential scale
@@ -150,10 +428,61 @@ def update_map(selected_stat):
             bgcolor='#f8f9fa',
             outlinecolor='#ebb39b',
             thickness=18
-        )
+        ),
+        mapbox_layers=boundary_layers(layer_names)
     )
     return fig
 
+# Callback to toggle the tiled boundary layers without rebuilding the map
+@app.callback(
+    Output('map_graph', 'figure', allow_duplicate=True),
+    [Input('boundary_layers', 'value')],
+    prevent_initial_call=True
+)
+def update_boundary_layers(layer_names):
+    patched = Patch()
+    patched['layout']['mapbox']['layers'] = boundary_layers(layer_names)
+    return patched
+
+# Callback to highlight the neighbourhoods most similar to the clicked one.
+# Only the marker styling is patched, so the map geometry is not resent.
+# Changing the statistic rebuilds the map without the highlight, so the
+# text is cleared to match.
+@app.callback(
+    [Output('map_graph', 'figure', allow_duplicate=True),
+     Output('similar_text', 'children')],
+    [Input('map_graph', 'clickData'),
+     Input('statistic_dropdown', 'value')],
+    prevent_initial_call=True
+)
+def highlight_similar(clickData, selected_stat):
+    if ctx.triggered_id == 'statistic_dropdown':
+        return no_update, ''
+
+    patched = Patch()
+    names = gdf['AREA_NAME'].tolist()
+    if not clickData or not clickData.get('points'):
+        patched['data'][0]['marker']['opacity'] = 0.85
+        patched['data'][0]['marker']['line'] = {'width': 1, 'color': '#444'}
+        return patched, ''
+
+    name = clickData['points'][0]['location']
+    matches = similar_neighbourhoods.get(name, [])
+    matched = {match for match, _ in matches}
+    patched['data'][0]['marker']['opacity'] = [
+        0.85 if n == name or n in matched else 0.3 for n in names
+    ]
+    patched['data'][0]['marker']['line'] = {
+        'width': [3 if n == name or n in matched else 0.5 for n in names],
+        'color': ['black' if n == name else '#d62728' if n in matched else '#444'
+                  for n in names]
+    }
+    text = [
+        html.Span(f"Most similar to {name}: "),
+        html.Span(', '.join(match for match, _ in matches))
+    ]
+    return patched, text
+
 # Callback to update histogram and percentile text based on click and statistic
 @app.callback(
     [Output('dist_graph', 'figure'),
@@ -233,5 +562,210 @@ def update_dist_and_text(clickData, selected_stat):
     )
     return fig, text
 
+# Callback to draw the correlation matrix for the chosen method
+@app.callback(
+    Output('correlation_graph', 'figure'),
+    [Input('correlation_method', 'value')]
+)
+def update_correlation(method):
+    corr = correlation_matrix(stat_frame, method=method, version=data_version)
+    fig = go.Figure(go.Heatmap(
+        z=corr.to_numpy(),
+        x=statistics,
+        y=statistics,
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        reversescale=True,
+        hovertemplate='%{y}<br>%{x}<br>r = %{z:.2f}<extra></extra>'
+    ))
+    fig.update_layout(
+        margin={'l': 0, 'r': 0, 't': 10, 'b': 0},
+        plot_bgcolor='#f8f9fa',
+        paper_bgcolor='#f8f9fa',
+        xaxis=dict(showticklabels=False),
+        yaxis=dict(autorange='reversed', tickfont=dict(size=9))
+    )
+    return fig
+
+# Callback to show the scatter for the clicked cell of the correlation matrix
+@app.callback(
+    [Output('scatter_graph', 'figure'),
+     Output('scatter_text', 'children')],
+    [Input('correlation_graph', 'clickData'),
+     Input('correlation_method', 'value')]
+)
+def update_scatter(clickData, method):
+    if clickData and clickData.get('points'):
+        x_stat = clickData['points'][0]['x']
+        y_stat = clickData['points'][0]['y']
+    else:
+        x_stat, y_stat = 'Median Total Income', 'Age-Standardized Diabetes Rate'
+
+    corr = correlation_matrix(stat_frame, method=method, version=data_version)
+    r = corr.at[y_stat, x_stat]
+    fig = go.Figure(go.Scatter(
+        x=stat_matrix[:, stat_index[x_stat]],
+        y=stat_matrix[:, stat_index[y_stat]],
+        mode='markers',
+        text=gdf['AREA_NAME'],
+        marker=dict(color='#21968a', line=dict(width=1, color='#2d5016')),
+        hovertemplate='<b>%{text}</b><br>%{x:.1f}, %{y:.1f}<extra></extra>'
+    ))
+    fig.update_layout(
+        margin={'l': 40, 'r': 40, 't': 40, 'b': 40},
+        plot_bgcolor='#f8f9fa',
+        paper_bgcolor='#f8f9fa',
+        font=dict(color='#9bad4e'),
+        xaxis=dict(title=x_stat, color='#9bad4e'),
+        yaxis=dict(title=y_stat, color='#9bad4e')
+    )
+    text = f"{method.title()} correlation of {x_stat} and {y_stat}: {r:.2f}"
+    return fig, text
+
+# Callback to draw the time-series map. Moving the slider only patches in
+# the cached values for that year; the figure is rebuilt when the
+# attribute changes.
+@app.callback(
+    Output('timeseries_graph', 'figure'),
+    [Input('timeseries_attribute', 'value'),
+     Input('year_slider', 'value')]
+)
+def update_timeseries_map(attribute, year):
+    values = timeseries_frames[attribute][year]
+    if ctx.triggered_id == 'year_slider':
+        patched = Patch()
+        patched['data'][0]['z'] = values
+        patched['layout']['coloraxis']['colorbar']['title']['text'] = f"{attribute} ({year})"
+        return patched
+
+    fig = go.Figure(go.Choroplethmapbox(
+        geojson=gdf.__geo_interface__,
+        locations=gdf['AREA_NAME'],
+        featureidkey='properties.AREA_NAME',
+        z=values,
+        coloraxis='coloraxis',
+        marker_opacity=0.85,
+        hovertemplate='<b>%{location}</b><br>%{z:,.0f}<extra></extra>'
+    ))
+    fig.update_layout(
+        mapbox_style='carto-positron',
+        mapbox=dict(center=dict(lat=centre_lat, lon=centre_lon), zoom=10),
+        margin={'l': 0, 'r': 0, 't': 0, 'b': 0},
+        coloraxis=dict(
+            colorscale='viridis',
+            cmin=timeseries_ranges[attribute]['min'],
+            cmax=timeseries_ranges[attribute]['max'],
+            colorbar=dict(title=dict(text=f"{attribute} ({year})"), thickness=18)
+        )
+    )
+    return fig
+
+# Callback to list profile attributes and CKAN packages and resources
+# matching the Data Browser search. Attributes can be opened in the table.
+@app.callback(
+    Output('data_search_results', 'children'),
+    [Input('data_search', 'value')]
+)
+def update_data_search(text):
+    if not text:
+        return None
+    hits = search(search_index, text, kind=DATA_SEARCH_KINDS, limit=DATA_SEARCH_LIMIT)
+    if not hits:
+        return html.Small('No matches.', className='text-muted')
+    items = []
+    for hit in hits:
+        if hit['kind'] == 'package':
+            # A package's label is its whole description; show its name
+            title, detail = hit['source'], 'package'
+        else:
+            title, detail = hit['label'], f"{hit['kind']} in {hit['source']}"
+        dataset = dataset_by_file.get(hit['source']) if hit['kind'] == 'attribute' else None
+        content = [html.Div(title), html.Small(detail, className='text-muted')]
+        if dataset is None:
+            items.append(dbc.ListGroupItem(content))
+        else:
+            items.append(dbc.ListGroupItem(
+                content,
+                id={'type': 'search_hit', 'dataset': dataset, 'key': hit['key']},
+                action=True,
+                n_clicks=0
+            ))
+    return dbc.ListGroup(items, flush=True)
+
+# Callback to set the table's columns and clear the sort and filter when
+# the dataset changes. Clicking an attribute in the search results opens
+# its profile file, filtered to that attribute's row.
+@app.callback(
+    [Output('dataset_dropdown', 'value'),
+     Output('data_table', 'columns'),
+     Output('data_table', 'sort_by'),
+     Output('data_table', 'filter_query')],
+    [Input('dataset_dropdown', 'value'),
+     Input({'type': 'search_hit', 'dataset': ALL, 'key': ALL}, 'n_clicks')]
+)
+def update_table_columns(dataset, hit_clicks):
+    filter_query = ''
+    if isinstance(ctx.triggered_id, dict):
+        # New results arrive with n_clicks=0; only react to real clicks
+        if not ctx.triggered[0]['value']:
+            return no_update, no_update, no_update, no_update
+        dataset = ctx.triggered_id['dataset']
+        filter_query = f"{{_id}} = {ctx.triggered_id['key']}"
+    frame = load_dataset(datasets[dataset])
+    columns = [{'name': str(col), 'id': str(col)} for col in frame.columns]
+    return dataset, columns, [], filter_query
+
+# Callback to fetch only the rows on the current page. A new dataset, sort
+# or filter starts again from the first page.
+@app.callback(
+    [Output('data_table', 'data'),
+     Output('data_table', 'page_count'),
+     Output('data_table', 'page_current')],
+    [Input('dataset_dropdown', 'value'),
+     Input('data_table', 'page_current'),
+     Input('data_table', 'page_size'),
+     Input('data_table', 'sort_by'),
+     Input('data_table', 'filter_query')]
+)
+def update_table_page(dataset, page_current, page_size, sort_by, filter_query):
+    if 'data_table.page_current' not in ctx.triggered_prop_ids:
+        page_current = 0
+    return query_page(datasets[dataset], page_current, page_size, sort_by, filter_query)
+
+# Background callback for the Moran's I test. It runs in a job process with
+# progress and cancel support; identical requests from other users share
+# one run through run_deduplicated.
+@app.callback(
+    output=Output('spatial_text', 'children'),
+    inputs=[Input('spatial_run', 'n_clicks')],
+    state=[State('statistic_dropdown', 'value')],
+    background=True,
+    running=[
+        (Output('spatial_run', 'disabled'), True, False),
+        (Output('spatial_cancel', 'disabled'), False, True)
+    ],
+    cancel=[Input('spatial_cancel', 'n_clicks')],
+    progress=[Output('spatial_progress', 'value'), Output('spatial_progress', 'max')],
+    prevent_initial_call=True
+)
+def run_spatial_statistics(set_progress, n_clicks, selected_stat):
+    set_progress((0, MORAN_PERMUTATIONS))
+    result = run_deduplicated(
+        ('morans_i', data_version, selected_stat, MORAN_PERMUTATIONS),
+        lambda progress: morans_i(
+            gdf[selected_stat].to_numpy(), spatial_weights,
+            permutations=MORAN_PERMUTATIONS, progress=progress
+        ),
+        progress=lambda done, total: set_progress((done, total))
+    )
+    if result['p_value'] < 0.05:
+        finding = ('Neighbouring areas tend to have similar values.' if result['I'] > result['expected']
+                   else 'Neighbouring areas tend to have dissimilar values.')
+    else:
+        finding = 'There is no clear spatial pattern.'
+    return (f"Moran's I for {selected_stat}: {result['I']:.3f} "
+            f"(p = {result['p_value']:.4f}). {finding}")
+
 if __name__ == '__main__':
     app.run(debug=False, host='0.0.0.0', port=8080)
@@ -0,0 +1,108 @@
+import json
+import re
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / 'flaskr' / 'data'
+
+
+def _profile_entries(path):
+    """One entry per attribute of a neighbourhood profile JSON export."""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    for record in records:
+        label = ' / '.join(
+            record[key].strip() for key in ('Category', 'Topic', 'Attribute')
+        )
+        yield label, 'attribute', path.name, str(record['_id'])
+
+
+def _metadata_entries(path):
+    """Entries for a CKAN package and its resources, from a saved metadata.json."""
+    with open(path, 'r', encoding='utf-8') as f:
+        package = json.load(f)
+    name = package.get('name', path.parent.name)
+    text = ' '.join(filter(None, [package.get('title'), package.get('excerpt'), package.get('notes')]))
+    yield text, 'package', name, package.get('id', '')
+    for resource in package.get('resources', []):
+        yield resource.get('name', ''), 'resource', name, resource.get('id', '')
+
+
+def collect_entries(statistics=(), data_dir=DATA_DIR):
+    """Everything worth searching: mappable statistics, profile attributes and CKAN metadata.
+
+    Yields:
+        tuple: (label, kind, source, key)
+    """
+    for stat in statistics:
+        yield stat, 'statistic', 'dashboard', stat
+    for path in sorted(Path(data_dir).rglob('*.json')):
+        if path.name == 'metadata.json':
+            yield from _metadata_entries(path)
+        elif 'neighbourhood_profiles' in path.name:
+            yield from _profile_entries(path)
+
+
+def build_index(entries, database=':memory:'):
+    """Build an SQLite FTS5 index over (label, kind, source, key) entries.
+
+    Prefix indexes for 1-3 character prefixes make typeahead queries a
+    direct index lookup instead of a scan of the term list.
+
+    Returns:
+        dict: The connection and the lock guarding it, for search().
+    """
+    conn = sqlite3.connect(database, check_same_thread=False)
+    conn.executescript(
+        'DROP TABLE IF EXISTS entries;'
+        'CREATE VIRTUAL TABLE entries USING fts5('
+        " label, kind UNINDEXED, source UNINDEXED, key UNINDEXED, prefix='1 2 3'"
+        ');'
+    )
+    with conn:
+        conn.executemany('INSERT INTO entries VALUES (?, ?, ?, ?)', entries)
+        conn.execute("INSERT INTO entries(entries) VALUES ('optimize')")
+    return {'conn': conn, 'lock': threading.Lock()}
+
+
+def to_match_query(text):
+    """Turn free text into an FTS5 query where every word must match as a prefix."""
+    words = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(index, text, kind=None, limit=20):
+    """Best matches for text, e.g. 'diab rate' finds 'Age-Standardized Diabetes Rate'.
+
+    Args:
+        index (dict): As returned by build_index.
+        text (str): What the user has typed so far.
+        kind (str or tuple): Only return entries of this kind (or kinds),
+            e.g. 'statistic'.
+        limit (int): Maximum number of results.
+
+    Returns:
+        list: Dicts with label, kind, source and key, best match first.
+    """
+    query = to_match_query(text)
+    if not query:
+        return []
+    sql = 'SELECT label, kind, source, key FROM entries WHERE entries MATCH ?'
+    params = [query]
+    if kind is not None:
+        kinds = (kind,) if isinstance(kind, str) else tuple(kind)
+        sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+        params.extend(kinds)
+    sql += ' ORDER BY rank LIMIT ?'
+    params.append(limit)
+    with index['lock']:
+        rows = index['conn'].execute(sql, params).fetchall()
+    return [dict(zip(('label', 'kind', 'source', 'key'), row)) for row in rows]
+
+
+if __name__ == '__main__':
+    index = build_index(collect_entries())
+    for result in search(index, ' '.join(sys.argv[1:])):
+        print(f"{result['kind']:<10} {result['source']:<50} {result['label']}")
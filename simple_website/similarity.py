@@ -0,0 +1,65 @@
+import warnings
+
+import numpy as np
+
+
+def standardize(frame):
+    """Z-score each column of a neighbourhood x attribute frame.
+
+    Missing values are imputed with the column mean (a z-score of 0) and
+    constant or empty columns are dropped so they don't add to distances.
+
+    Args:
+        frame (pd.DataFrame): One row per neighbourhood, numeric columns.
+
+    Returns:
+        np.ndarray: The standardized (n_neighbourhoods, n_attributes) matrix.
+    """
+    values = frame.to_numpy(dtype=float)
+    with warnings.catch_warnings():
+        # All-NaN columns are dropped below, so their warnings are noise
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    keep = np.isfinite(std) & (std > 0)
+    matrix = (values[:, keep] - mean[keep]) / std[keep]
+    matrix[np.isnan(matrix)] = 0.0
+    return matrix
+
+
+def build_similarity_index(frame, k=5):
+    """Precompute the k nearest neighbours of every neighbourhood.
+
+    All pairwise squared distances come out of a single matrix product,
+    so a lookup at click time is just a dictionary access.
+
+    Args:
+        frame (pd.DataFrame): Neighbourhood x attribute frame, indexed by name.
+        k (int): Number of neighbours to keep per neighbourhood.
+
+    Returns:
+        dict: Maps each neighbourhood name to a list of (name, distance)
+            tuples, closest first.
+    """
+    names = list(frame.index)
+    matrix = standardize(frame)
+    k = min(k, len(names) - 1)
+
+    sq_norms = np.einsum('ij,ij->i', matrix, matrix)
+    dist = sq_norms[:, None] + sq_norms[None, :] - 2 * matrix @ matrix.T
+    np.maximum(dist, 0, out=dist)
+    # A neighbourhood is never its own match
+    np.fill_diagonal(dist, np.inf)
+
+    nearest = np.argpartition(dist, k, axis=1)[:, :k]
+    rows = np.arange(len(names))[:, None]
+    order = np.argsort(dist[rows, nearest], axis=1)
+    nearest = nearest[rows, order]
+    # Scale by the number of attributes so distances are comparable
+    # between profiles with very different widths
+    scaled = np.sqrt(dist[rows, nearest] / max(matrix.shape[1], 1))
+
+    return {
+        name: [(names[j], float(d)) for j, d in zip(nearest[i], scaled[i])]
+        for i, name in enumerate(names)
+    }
@@ -0,0 +1,195 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+
+import geopandas as gpd
+
+from map_statistics import STATISTICS
+
+GEOJSON_PATH = Path(__file__).parent / 'toronto_map_data.geojson'
+SNAPSHOT_DIR = Path(__file__).parent / 'snapshots'
+
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# Colormaps snapshots can be requested in; the first is the default. Kept
+# short so the cache stays bounded: statistics x colormaps x formats files.
+CMAPS = ('viridis', 'cividis', 'magma', 'plasma', 'Greens', 'Blues')
+DEFAULT_STYLE = {
+    'cmap': 'viridis',
+    'width': 8,
+    'height': 7,
+    'dpi': 150,
+    'edgecolor': 'white',
+    'linewidth': 0.3,
+}
+
+
+def data_version(path=GEOJSON_PATH):
+    """Changes whenever the data file does."""
+    stat = Path(path).stat()
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+
+def load_geometry(path=GEOJSON_PATH):
+    """The map data in a metre-based CRS, so the city isn't stretched."""
+    return gpd.read_file(path).to_crs(epsg=2952)
+
+
+def snapshot_key(version, statistic, fmt, style):
+    """Content address of a snapshot: the same inputs always give the same key."""
+    payload = json.dumps(
+        {'version': version, 'statistic': statistic, 'format': fmt, 'style': style},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_snapshot(gdf, statistic, fmt='png', style=None):
+    """Render a choropleth of one statistic to PNG or SVG bytes."""
+    style = {**DEFAULT_STYLE, **(style or {})}
+    # A bare Figure rather than pyplot, so renders don't share global state
+    fig = Figure(figsize=(style['width'], style['height']), dpi=style['dpi'])
+    ax = fig.subplots()
+    gdf.plot(
+        column=statistic,
+        cmap=style['cmap'],
+        edgecolor=style['edgecolor'],
+        linewidth=style['linewidth'],
+        legend=True,
+        legend_kwds={'label': statistic, 'shrink': 0.6},
+        missing_kwds={'color': 'lightgrey'},
+        ax=ax
+    )
+    ax.set_axis_off()
+    ax.set_title(statistic)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def get_snapshot(gdf, version, statistic, fmt='png', style=None, snapshot_dir=SNAPSHOT_DIR):
+    """Path to a cached snapshot, rendering it first if it isn't cached yet.
+
+    Returns:
+        tuple: (path, key)
+    """
+    style = {**DEFAULT_STYLE, **(style or {})}
+    key = snapshot_key(version, statistic, fmt, style)
+    path = Path(snapshot_dir) / f'{key}.{fmt}'
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = render_snapshot(gdf, statistic, fmt, style)
+        # Write to a unique temporary file and rename, so readers never see
+        # half a file and concurrent renders of the same key don't collide
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f'{key}.', suffix='.tmp', delete=False
+        ) as tmp:
+            tmp.write(data)
+        try:
+            os.replace(tmp.name, path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+    return path, key
+
+
+# Each pool process loads the geometry once and reuses it for every render
+_worker_gdf = None
+
+
+def _init_worker(geojson_path):
+    global _worker_gdf
+    _worker_gdf = load_geometry(geojson_path)
+
+
+def _render_job(version, statistic, fmt, style, snapshot_dir):
+    return get_snapshot(_worker_gdf, version, statistic, fmt, style, snapshot_dir)[0]
+
+
+# Renders for the web app, in their own processes so they don't hold up
+# request threads. Futures are keyed by snapshot, so concurrent requests
+# for the same image share one render.
+_pool = None
+_pending = {}
+_pool_lock = threading.Lock()
+
+
+def pooled_snapshot(version, statistic, fmt='png', style=None, timeout=None, workers=2,
+                    geojson_path=GEOJSON_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Path to a cached snapshot, rendering it in the process pool if needed.
+
+    Returns:
+        Path: The snapshot, or None if it wasn't rendered within timeout
+            seconds. The render carries on and caches the result.
+    """
+    global _pool
+    style = {**DEFAULT_STYLE, **(style or {})}
+    key = snapshot_key(version, statistic, fmt, style)
+    path = Path(snapshot_dir) / f'{key}.{fmt}'
+    if path.exists():
+        return path
+
+    with _pool_lock:
+        future = _pending.get(key)
+        if future is None:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_worker, initargs=(geojson_path,)
+                )
+            future = _pool.submit(_render_job, version, statistic, fmt, style, snapshot_dir)
+            _pending[key] = future
+            future.add_done_callback(lambda _: _pending.pop(key, None))
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        return None
+    except BrokenProcessPool:
+        # A render process died; start a fresh pool for the next request
+        with _pool_lock:
+            _pool = None
+        raise
+
+
+def render_all(statistics, formats=('png', 'svg'), style=None, workers=None,
+               geojson_path=GEOJSON_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Render every statistic in every format across a process pool.
+
+    Snapshots already in the cache are skipped, so re-running after a
+    style or data change only renders what changed.
+
+    Returns:
+        list: Paths of all the snapshots.
+    """
+    version = data_version(geojson_path)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(geojson_path,)
+    ) as pool:
+        futures = [
+            pool.submit(_render_job, version, statistic, fmt, style, snapshot_dir)
+            for statistic in statistics
+            for fmt in formats
+        ]
+        return [future.result() for future in futures]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render static choropleths for every statistic.')
+    parser.add_argument('--format', nargs='+', default=['png', 'svg'], choices=list(FORMATS))
+    parser.add_argument('--cmap', nargs='+', default=[CMAPS[0]], choices=CMAPS)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    paths = []
+    for cmap in args.cmap:
+        paths += render_all(STATISTICS, args.format, {'cmap': cmap}, args.workers)
+    print(f"Saved {len(paths)} snapshots to {SNAPSHOT_DIR}")
@@ -0,0 +1,292 @@
+import argparse
+import functools
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import geopandas as gpd
+import mapbox_vector_tile
+from shapely import box, clip_by_rect
+
+NEIGHBOURHOODS_DIR = Path(__file__).parent.parent / 'flaskr' / 'data' / 'neighbourhoods'
+
+# Layer name -> boundary file. Layers are cut into tiles together, so a
+# single tile request returns every layer for that area.
+LAYERS = {
+    'neighbourhoods': NEIGHBOURHOODS_DIR / 'Neighbourhoods___4326_gpkg.gpkg',
+    'neighbourhoods_140': NEIGHBOURHOODS_DIR / 'Neighbourhoods___historical_140___4326_gpkg.gpkg',
+}
+PROPERTIES = ['AREA_SHORT_CODE', 'AREA_NAME']
+
+TILESET_PATH = Path(__file__).parent / 'tiles' / 'neighbourhoods.mbtiles'
+
+EXTENT = 4096
+# Deepest zoom the map can request
+MAX_ZOOM = 22
+# Half the width of the web mercator world, in metres
+ORIGIN_SHIFT = 20037508.342789244
+
+
+def tile_bounds(z, x, y):
+    """Web mercator (EPSG:3857) bounds of an XYZ tile as (minx, miny, maxx, maxy)."""
+    size = 2 * ORIGIN_SHIFT / 2 ** z
+    minx = -ORIGIN_SHIFT + x * size
+    maxy = ORIGIN_SHIFT - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def tile_range(bounds, z):
+    """XYZ tile columns and rows covering web mercator bounds at zoom z."""
+    minx, miny, maxx, maxy = bounds
+    size = 2 * ORIGIN_SHIFT / 2 ** z
+    last = 2 ** z - 1
+    x0 = max(0, int((minx + ORIGIN_SHIFT) // size))
+    x1 = min(last, int((maxx + ORIGIN_SHIFT) // size))
+    y0 = max(0, int((ORIGIN_SHIFT - maxy) // size))
+    y1 = min(last, int((ORIGIN_SHIFT - miny) // size))
+    return range(x0, x1 + 1), range(y0, y1 + 1)
+
+
+def load_layers(layers=LAYERS):
+    """Read each layer's boundaries in web mercator, keeping only the tile properties."""
+    frames = {}
+    for name, path in layers.items():
+        gdf = gpd.read_file(path).to_crs(epsg=3857)
+        frames[name] = gdf[PROPERTIES + ['geometry']]
+    return frames
+
+
+def encode_tile(frames, z, x, y, buffer=64):
+    """Encode one gzipped Mapbox Vector Tile, or return None if it would be empty.
+
+    Geometry is clipped to the tile (plus a small buffer so outlines don't
+    show seams) and simplified to about a quarter of a tile pixel, so low
+    zoom tiles stay small.
+    """
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    pad = (maxx - minx) * buffer / EXTENT
+    tolerance = (maxx - minx) / EXTENT / 4
+
+    layers = []
+    for name, gdf in frames.items():
+        hits = gdf.sindex.query(
+            box(minx - pad, miny - pad, maxx + pad, maxy + pad), predicate='intersects'
+        )
+        if len(hits) == 0:
+            continue
+        subset = gdf.iloc[hits]
+        clipped = clip_by_rect(
+            subset.geometry.simplify(tolerance).to_numpy(),
+            minx - pad, miny - pad, maxx + pad, maxy + pad
+        )
+        features = [
+            {'geometry': geom, 'properties': properties}
+            for geom, properties in zip(clipped, subset[PROPERTIES].to_dict('records'))
+            if not geom.is_empty
+        ]
+        if features:
+            layers.append({'name': name, 'features': features})
+
+    if not layers:
+        return None
+    data = mapbox_vector_tile.encode(layers, default_options={
+        'quantize_bounds': (minx, miny, maxx, maxy),
+        'extents': EXTENT,
+    })
+    return gzip.compress(data)
+
+
+def build_tileset(path=TILESET_PATH, minzoom=8, maxzoom=14, layers=LAYERS):
+    """Cut every layer into vector tiles and write them to an MBTiles file.
+
+    Args:
+        path (Path): MBTiles file to (re)create.
+        minzoom (int): Lowest zoom level to generate.
+        maxzoom (int): Highest zoom level to generate.
+        layers (dict): Layer name -> boundary file.
+
+    Returns:
+        int: Number of tiles written.
+    """
+    frames = load_layers(layers)
+    bounds = gpd.GeoSeries(
+        [gdf.union_all().envelope for gdf in frames.values()], crs=3857
+    ).total_bounds
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Build beside the old tileset and swap it in at the end, so a running
+    # server keeps reading a complete file until the new one is ready
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.unlink(missing_ok=True)
+    db = sqlite3.connect(tmp)
+    db.executescript(
+        'CREATE TABLE metadata (name TEXT, value TEXT);'
+        'CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER,'
+        ' tile_row INTEGER, tile_data BLOB);'
+        'CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);'
+    )
+
+    count = 0
+    for z in range(minzoom, maxzoom + 1):
+        columns, rows = tile_range(bounds, z)
+        batch = []
+        for x in columns:
+            for y in rows:
+                data = encode_tile(frames, z, x, y)
+                if data is not None:
+                    # MBTiles rows count up from the bottom (TMS)
+                    batch.append((z, x, 2 ** z - 1 - y, data))
+        db.executemany('INSERT INTO tiles VALUES (?, ?, ?, ?)', batch)
+        count += len(batch)
+        print(f"Zoom {z}: {len(batch)} tiles")
+
+    lonlat = gpd.GeoSeries.from_xy(bounds[[0, 2]], bounds[[1, 3]], crs=3857).to_crs(epsg=4326)
+    west, east = lonlat.x
+    south, north = lonlat.y
+    metadata = {
+        'name': path.stem,
+        'format': 'pbf',
+        'minzoom': minzoom,
+        'maxzoom': maxzoom,
+        'bounds': f'{west},{south},{east},{north}',
+        'center': f'{(west + east) / 2},{(south + north) / 2},{minzoom}',
+        'json': json.dumps({'vector_layers': [
+            {'id': name, 'fields': {prop: 'String' for prop in PROPERTIES}}
+            for name in frames
+        ]}),
+    }
+    db.executemany('INSERT INTO metadata VALUES (?, ?)', [(k, str(v)) for k, v in metadata.items()])
+    db.commit()
+    db.close()
+    os.replace(tmp, path)
+    return count
+
+
+# One read-only connection per thread, keyed by tileset path. Each is kept
+# with the identity of the file it opened, so a rebuilt tileset (which
+# replaces the file) gets a fresh connection instead of the old inode.
+_connections = threading.local()
+
+
+def _file_id(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+
+def _open_tileset(path):
+    """This thread's connection to a tileset and its zoom range, or None if it doesn't exist."""
+    connections = _connections.__dict__.setdefault('by_path', {})
+    file_id = _file_id(path)
+    tileset = connections.get(path)
+    if tileset is not None and tileset['file_id'] != file_id:
+        tileset['db'].close()
+        del connections[path]
+        tileset = None
+    if tileset is None and file_id is not None:
+        db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        metadata = dict(db.execute(
+            "SELECT name, value FROM metadata WHERE name IN ('minzoom', 'maxzoom')"
+        ).fetchall())
+        tileset = connections[path] = {
+            'db': db,
+            'file_id': file_id,
+            'minzoom': int(metadata['minzoom']),
+            'maxzoom': int(metadata['maxzoom']),
+        }
+    return tileset
+
+
+def read_tile(z, x, y, path=TILESET_PATH):
+    """Gzipped tile bytes for an XYZ tile, or None if the tileset has no such tile."""
+    tileset = _open_tileset(path)
+    if tileset is None:
+        return None
+    row = tileset['db'].execute(
+        'SELECT tile_data FROM tiles'
+        ' WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+        (z, x, 2 ** z - 1 - y)
+    ).fetchone()
+    return row[0] if row else None
+
+
+_frames = None
+_frames_lock = threading.Lock()
+
+
+def _layer_frames():
+    global _frames
+    if _frames is None:
+        with _frames_lock:
+            if _frames is None:
+                _frames = load_layers()
+    return _frames
+
+
+@functools.lru_cache(maxsize=4096)
+def render_tile(z, x, y):
+    """Cut a tile straight from the boundary files, for zooms the tileset doesn't cover."""
+    return encode_tile(_layer_frames(), z, x, y)
+
+
+def get_tile(z, x, y, path=TILESET_PATH):
+    """Gzipped tile bytes for an XYZ tile, or None if there is nothing to draw.
+
+    Zooms in the tileset's range are read from the MBTiles file. Others,
+    such as over-zoomed requests past its maxzoom, or every zoom when no
+    tileset has been built, are cut on demand and kept in an LRU cache.
+    """
+    tileset = _open_tileset(path)
+    if tileset is not None and tileset['minzoom'] <= z <= tileset['maxzoom']:
+        return read_tile(z, x, y, path)
+    return render_tile(z, x, y)
+
+
+def tiles_version(path=TILESET_PATH):
+    """Changes whenever the tileset or any boundary file does, for ETags."""
+    parts = []
+    for source in [path, *LAYERS.values()]:
+        try:
+            stat = os.stat(source)
+        except OSError:
+            parts.append('-')
+        else:
+            parts.append(f'{stat.st_mtime_ns:x}')
+    return '-'.join(parts)
+
+
+def vector_tile_layer(url, source_layer, color='#2d5016', width=1.5, **kwargs):
+    """Mapbox layer that draws outlines from a vector tile endpoint.
+
+    Args:
+        url (str): Tile URL template with {z}/{x}/{y} placeholders.
+        source_layer (str): Layer name inside the tiles, a key of LAYERS.
+
+    Returns:
+        dict: Suitable for a figure's layout.mapbox.layers list.
+    """
+    return dict(
+        sourcetype='vector',
+        source=[url],
+        sourcelayer=source_layer,
+        type='line',
+        color=color,
+        line=dict(width=width),
+        **kwargs
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the neighbourhood vector tileset.')
+    parser.add_argument('--minzoom', type=int, default=8)
+    parser.add_argument('--maxzoom', type=int, default=14)
+    parser.add_argument('--output', type=Path, default=TILESET_PATH)
+    args = parser.parse_args()
+    total = build_tileset(args.output, args.minzoom, args.maxzoom)
+    print(f"Saved {total} tiles to {args.output}")
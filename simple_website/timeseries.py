@@ -0,0 +1,320 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds aren't locked, but the rename keeps them safe
+    fcntl = None
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path(__file__).parent.parent / 'flaskr' / 'data'
+NEIGHBOURHOODS_DIR = DATA_DIR / 'neighbourhoods'
+PROFILES_DIR = DATA_DIR / 'neighbourhood-profiles'
+
+# Boundary files in a metre-based CRS (EPSG:2952), so overlap areas are real areas
+BOUNDARIES_140 = NEIGHBOURHOODS_DIR / 'Neighbourhoods___historical_140___2952_gpkg.gpkg'
+BOUNDARIES_158 = NEIGHBOURHOODS_DIR / 'Neighbourhoods___2952_gpkg.gpkg'
+
+GEOJSON_PATH = Path(__file__).parent / 'toronto_map_data.geojson'
+STORE_DIR = Path(__file__).parent / 'timeseries'
+
+# Each series maps a year to where its values come from: a profile JSON in
+# the 140 model (crosswalked to 158) or a column of the 158-model GeoJSON.
+# 'count' series are split between neighbourhoods by overlapping area.
+SERIES = {
+    'Total population': {
+        'kind': 'count',
+        'years': {
+            1996: ('profile_140', 'neighbourhood_profiles_2001_140_model_json.json',
+                   'Population, 1996 - 100% Data'),
+            2001: ('profile_140', 'neighbourhood_profiles_2001_140_model_json.json',
+                   'Population, 2001 - 100% Data'),
+            2022: ('geojson_158', None, 'Total population 2022'),
+            2023: ('geojson_158', None, 'Total population 2023'),
+        }
+    }
+}
+
+
+def normalize_name(name):
+    """Normalize a neighbourhood name so the profiles and boundary files agree.
+
+    Drops the trailing ' (NN)' code used in the boundary files and spells
+    'St.James' as 'St. James'.
+    """
+    name = re.sub(r'\s*\(\d+\)$', '', name.strip())
+    return re.sub(r'St\.(?=James)', 'St. ', name)
+
+
+def build_crosswalk(source, target, source_key, target_key):
+    """Area-weighted crosswalk between two sets of neighbourhood boundaries.
+
+    Args:
+        source (gpd.GeoDataFrame): Boundaries the data was published for.
+        target (gpd.GeoDataFrame): Boundaries to move the data onto.
+        source_key (str): Column identifying each source neighbourhood.
+        target_key (str): Column identifying each target neighbourhood.
+
+    Returns:
+        tuple: (weights, source_ids, target_ids) where weights[i, j] is the
+            share of source neighbourhood i's area that lies in target j.
+    """
+    if source.crs != target.crs:
+        target = target.to_crs(source.crs)
+    source_ids = source[source_key].tolist()
+    target_ids = target[target_key].tolist()
+
+    pieces = gpd.overlay(
+        source[[source_key, 'geometry']].rename(columns={source_key: 'source_id'}),
+        target[[target_key, 'geometry']].rename(columns={target_key: 'target_id'}),
+        how='intersection',
+        keep_geom_type=True
+    )
+    source_pos = pd.Index(source_ids).get_indexer(pieces['source_id'])
+    target_pos = pd.Index(target_ids).get_indexer(pieces['target_id'])
+
+    weights = np.zeros((len(source_ids), len(target_ids)))
+    np.add.at(weights, (source_pos, target_pos), pieces.geometry.area.to_numpy())
+    weights /= source.geometry.area.to_numpy()[:, None]
+    return weights, source_ids, target_ids
+
+
+def crosswalk_140_to_158(target_names):
+    """Crosswalk from the historical 140 neighbourhoods to the current 158.
+
+    Args:
+        target_names (pd.Series): Current neighbourhood names indexed by
+            integer AREA_SHORT_CODE, in the order the result should use.
+
+    Returns:
+        tuple: (weights, source_names) with weights shaped (140, len(target_names)).
+    """
+    source = gpd.read_file(BOUNDARIES_140)
+    source['name'] = source['AREA_NAME'].map(normalize_name)
+    target = gpd.read_file(BOUNDARIES_158)
+    target['code'] = target['AREA_SHORT_CODE'].astype(int)
+    target = target.set_index('code').loc[target_names.index.tolist()].reset_index()
+
+    weights, source_names, _ = build_crosswalk(source, target, 'name', 'code')
+    return weights, source_names
+
+
+def _profile_values(filename, attribute, names):
+    """Values of one profile attribute for the given neighbourhood names."""
+    with open(PROFILES_DIR / filename, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    record = next(r for r in records if r['Attribute'].strip() == attribute)
+    values = {normalize_name(k): v for k, v in record.items()}
+    return np.array([values.get(n) for n in names], dtype=float)
+
+
+def store_version(geojson_path=GEOJSON_PATH, series=SERIES):
+    """Changes whenever SERIES or any file the store is built from does."""
+    sources = {Path(geojson_path)}
+    for spec in series.values():
+        for source, filename, _ in spec['years'].values():
+            if source == 'profile_140':
+                sources |= {PROFILES_DIR / filename, BOUNDARIES_140, BOUNDARIES_158}
+    files = {}
+    for path in sorted(sources):
+        stat = path.stat()
+        files[path.name] = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+    payload = json.dumps({'series': series, 'files': files}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def compute_store(gdf, series=SERIES, version=None):
+    """Compute the year x neighbourhood x attribute store on the 158-model boundaries.
+
+    Values missing for a year are NaN.
+
+    Args:
+        gdf (gpd.GeoDataFrame): The 158-model data with AREA_SHORT_CODE and AREA_NAME.
+        series (dict): Which attributes to include and where each year comes from.
+        version (str): Source data version to record, from store_version.
+
+    Returns:
+        dict: 'version', 'years', 'neighbourhoods' and 'attributes', 'values'
+            mapping each year to its (neighbourhood, attribute) array, and
+            the 'crosswalk' used (None if no series needed one).
+    """
+    target_names = pd.Series(
+        gdf['AREA_NAME'].tolist(), index=gdf['AREA_SHORT_CODE'].astype(int)
+    )
+    attributes = list(series)
+    years = sorted({year for spec in series.values() for year in spec['years']})
+    cube = np.full((len(years), len(target_names), len(attributes)), np.nan)
+
+    weights = source_names = None
+    for a, attribute in enumerate(attributes):
+        spec = series[attribute]
+        for year, (source, filename, column) in spec['years'].items():
+            y = years.index(year)
+            if source == 'geojson_158':
+                cube[y, :, a] = gdf[column].to_numpy(dtype=float)
+            elif source == 'profile_140':
+                if weights is None:
+                    weights, source_names = crosswalk_140_to_158(target_names)
+                values = _profile_values(filename, column, source_names)
+                if spec['kind'] == 'count':
+                    cube[y, :, a] = np.nan_to_num(values) @ weights
+                else:
+                    # Rates are averaged, weighted by the area each source contributes
+                    share = weights * np.isfinite(values)[:, None]
+                    cube[y, :, a] = (np.nan_to_num(values) @ share) / share.sum(axis=0)
+            else:
+                raise ValueError(f"Unknown source {source!r} for {attribute} {year}.")
+
+    return {
+        'version': version,
+        'years': years,
+        'neighbourhoods': target_names.tolist(),
+        'attributes': attributes,
+        'values': {year: cube[y].astype(np.float32) for y, year in enumerate(years)},
+        'crosswalk': None if weights is None else (weights, source_names, target_names.tolist()),
+    }
+
+
+def save_store(store, store_dir=STORE_DIR):
+    """Write a store to store_dir/<version>, one .npy file per year.
+
+    The files are written to a temporary directory that is then renamed
+    into place, so a reader never sees a half-written store. If another
+    process got there first, its copy is kept.
+
+    Returns:
+        Path: The directory the store is in.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    target = store_dir / store['version']
+    tmp = Path(tempfile.mkdtemp(dir=store_dir, prefix='.building-'))
+    try:
+        if store['crosswalk'] is not None:
+            # Keep the crosswalk so other 140-model data can be moved without the overlay
+            weights, source_names, target_names = store['crosswalk']
+            np.savez_compressed(
+                tmp / 'crosswalk_140_158.npz',
+                weights=weights,
+                source=np.array(source_names),
+                target=np.array(target_names, dtype=str)
+            )
+        for year in store['years']:
+            np.save(tmp / f'{year}.npy', store['values'][year])
+        with open(tmp / 'index.json', 'w') as f:
+            json.dump({
+                key: store[key] for key in ('version', 'years', 'neighbourhoods', 'attributes')
+            }, f, indent=2)
+        os.rename(tmp, target)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not target.is_dir():
+            raise
+    return target
+
+
+def load_store(path):
+    """Read a store written by save_store from its version directory."""
+    path = Path(path)
+    with open(path / 'index.json', 'r') as f:
+        store = json.load(f)
+    store['values'] = {year: np.load(path / f'{year}.npy') for year in store['years']}
+    store['crosswalk'] = None
+    return store
+
+
+def _remove_old_versions(store_dir, version):
+    # Dot entries are the lock and other processes' builds in progress
+    for path in Path(store_dir).iterdir():
+        if path.name == version or path.name.startswith('.'):
+            continue
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+
+def build_store(gdf, store_dir=STORE_DIR, series=SERIES, version=None):
+    """Compute a store and save it, replacing any older versions.
+
+    Returns:
+        Path: The directory the store is in.
+    """
+    path = save_store(compute_store(gdf, series, version), store_dir)
+    _remove_old_versions(store_dir, path.name)
+    return path
+
+
+def load_or_build_store(gdf, geojson_path=GEOJSON_PATH, store_dir=STORE_DIR):
+    """Open the store for the current data, building it first if needed.
+
+    Stores live in a directory per source data version, so a change to the
+    data or SERIES is picked up automatically. Under gunicorn every worker
+    calls this at import; a file lock lets one of them build while the
+    others wait and then read its result. Where store_dir can't be written
+    (e.g. a read-only deploy), the store is computed in memory instead.
+
+    Args:
+        gdf (gpd.GeoDataFrame): The 158-model data, read from geojson_path.
+        geojson_path (Path): Where gdf was read from, to version the store.
+        store_dir (Path): Directory holding the store versions.
+
+    Returns:
+        dict: As returned by compute_store.
+    """
+    version = store_version(geojson_path)
+    path = Path(store_dir) / version
+    if path.is_dir():
+        return load_store(path)
+
+    try:
+        Path(store_dir).mkdir(parents=True, exist_ok=True)
+        lock = open(Path(store_dir) / '.lock', 'a')
+    except OSError:
+        return compute_store(gdf, version=version)
+
+    with lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if path.is_dir():
+            return load_store(path)
+        store = compute_store(gdf, version=version)
+        try:
+            save_store(store, store_dir)
+            _remove_old_versions(store_dir, version)
+        except OSError:
+            pass
+    return store
+
+
+def year_frames(store, attribute, neighbourhoods):
+    """Per-year value lists for one attribute, ready to send to the browser.
+
+    Args:
+        store (dict): As returned by load_store.
+        attribute (str): One of store['attributes'].
+        neighbourhoods (list): Names in the order the map figure uses.
+
+    Returns:
+        dict: Maps each year to a list of values, None where missing.
+    """
+    a = store['attributes'].index(attribute)
+    order = pd.Index(store['neighbourhoods']).get_indexer(neighbourhoods)
+    frames = {}
+    for year in store['years']:
+        values = np.asarray(store['values'][year][order, a], dtype=float)
+        frames[year] = [None if np.isnan(v) else round(float(v), 1) for v in values]
+    return frames
+
+
+if __name__ == '__main__':
+    path = build_store(gpd.read_file(GEOJSON_PATH), version=store_version())
+    print(f"Saved time-series store to {path}")
@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+from flaskr import create_app
+from flaskr.db import close_thread_connections, get_db, init_db
+
+# The dashboard modules import each other by bare name, as when run from simple_website/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'simple_website'))
+
+with open(os.path.join(os.path.dirname(__file__), 'data.sql'), 'rb') as f:
+    _data_sql = f.read().decode('utf8')
+
+
+@pytest.fixture
+def app():
+    db_fd, db_path = tempfile.mkstemp()
+
+    app = create_app({
+        'TESTING': True,
+        'DATABASE': db_path,
+    })
+
+    with app.app_context():
+        init_db()
+        get_db().executescript(_data_sql)
+
+    yield app
+
+    close_thread_connections()
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
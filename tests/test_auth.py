@@ -0,0 +1,27 @@
+from flaskr.auth import _hash_slots
+
+
+def test_login(client):
+    response = client.post('/auth/login', data={'username': 'test', 'password': 'test'})
+    assert response.headers['Location'] == '/'
+
+    with client.session_transaction() as session:
+        assert session['user_id'] == 1
+
+
+def test_login_busy(app, client):
+    # With every hashing slot taken, a login is turned away instead of queueing
+    app.config['PASSWORD_HASH_WAIT'] = 0.01
+    with app.app_context():
+        slots = _hash_slots()
+        for _ in range(app.config['PASSWORD_HASH_WORKERS']):
+            slots.acquire()
+
+    response = client.post('/auth/login', data={'username': 'test', 'password': 'test'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+    for _ in range(app.config['PASSWORD_HASH_WORKERS']):
+        slots.release()
+    response = client.post('/auth/login', data={'username': 'test', 'password': 'test'})
+    assert response.status_code == 302
@@ -0,0 +1,87 @@
+import html
+import re
+
+import pytest
+from flask import g
+from werkzeug.exceptions import Forbidden, NotFound
+
+from flaskr.blog import get_post
+from flaskr.db import get_db
+
+
+def add_posts(app, created):
+    """Insert one post per timestamp and return their ids, oldest insert first."""
+    with app.app_context():
+        db = get_db()
+        ids = [
+            db.execute(
+                'INSERT INTO post (title, body, author_id, created)'
+                ' VALUES (?, ?, 1, ?) RETURNING id',
+                (f'post {i}', 'body', timestamp)
+            ).fetchone()[0]
+            for i, timestamp in enumerate(created)
+        ]
+        db.commit()
+    return ids
+
+
+def read_pages(client):
+    """Follow the "Older posts" links from the index, returning each page's titles."""
+    pages = []
+    url = '/'
+    while url is not None:
+        page = client.get(url).get_data(as_text=True)
+        pages.append(re.findall(r'<article class="post">\s*<header>\s*<div>\s*<h1>(.*?)</h1>', page))
+        match = re.search(r'<a class="action" href="([^"]*)">Older posts</a>', page)
+        url = html.unescape(match.group(1)) if match else None
+    return pages
+
+
+def test_index(client):
+    response = client.get('/')
+    assert b'test title' in response.data
+    assert b'by test on 2018-01-01' in response.data
+    assert b'Older posts' not in response.data
+
+
+@pytest.mark.parametrize(('extra', 'expected_pages'), (
+    (1, [2]),       # exactly one full page: no link to an empty page
+    (2, [2, 1]),    # one row past the boundary
+    (3, [2, 2]),
+))
+def test_index_page_boundaries(app, client, extra, expected_pages):
+    app.config['POSTS_PER_PAGE'] = 2
+    add_posts(app, [f'2019-01-0{i + 1} 00:00:00' for i in range(extra)])
+
+    assert [len(page) for page in read_pages(client)] == expected_pages
+
+
+def test_index_pages_through_ties(app, client):
+    # Posts sharing a timestamp are ordered by id, so none are skipped or
+    # repeated when a page boundary falls between them
+    app.config['POSTS_PER_PAGE'] = 3
+    ids = add_posts(app, ['2019-01-01 00:00:00'] * 5 + ['2019-01-02 00:00:00'] * 2)
+    titles = {post_id: f'post {i}' for i, post_id in enumerate(ids)}
+
+    pages = read_pages(client)
+    expected = [titles[i] for i in (ids[6], ids[5], ids[4], ids[3], ids[2], ids[1], ids[0])]
+    assert [title for page in pages for title in page] == expected + ['test title']
+    assert [len(page) for page in pages] == [3, 3, 2]
+
+
+def test_get_post(app):
+    with app.test_request_context():
+        g.user = get_db().execute('SELECT * FROM user WHERE id = 1').fetchone()
+        assert get_post(1)['title'] == 'test title'
+
+        with pytest.raises(NotFound):
+            get_post(2)
+
+
+def test_get_post_other_author(app):
+    with app.test_request_context():
+        g.user = get_db().execute('SELECT * FROM user WHERE id = 2').fetchone()
+        with pytest.raises(Forbidden):
+            get_post(1)
+        # Reading without the author check is allowed
+        assert get_post(1, check_author=False)['id'] == 1
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import correlation_matrix, pairwise_pearson
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=200)
+    return pd.DataFrame({
+        'a': base,
+        'b': base * 3 + rng.normal(size=200),
+        # A large mean relative to the spread, which the one-pass sums
+        # can't handle without centring
+        'c': 1e7 + base * 0.5 + rng.normal(size=200),
+        'd': np.exp(rng.normal(size=200)),
+    })
+
+
+@pytest.mark.parametrize('method', ('pearson', 'spearman'))
+def test_matches_pandas(frame, method):
+    result = correlation_matrix(frame, method=method)
+    np.testing.assert_allclose(result.to_numpy(), frame.corr(method=method).to_numpy(), atol=1e-9)
+
+
+def test_pearson_missing_values(frame):
+    frame.iloc[::7, 0] = np.nan
+    frame.iloc[::5, 2] = np.nan
+    result = pairwise_pearson(frame.to_numpy())
+    np.testing.assert_allclose(result, frame.corr().to_numpy(), atol=1e-9)
+
+
+def test_too_few_rows():
+    values = np.array([[1.0, np.nan], [2.0, 3.0], [np.nan, 4.0]])
+    result = pairwise_pearson(values)
+    assert np.isnan(result[0, 1])
@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from data_table import _filter_mask, parse_filter, query_page
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'name': ['Agincourt', 'agincourt south', 'Bay Street', 'Casa Loma', None],
+        'age': [40.5, 38.0, 31.0, 45.0, 50.0],
+        # Numbers stored as text, as in the profile exports
+        'count': ['10', '200', '3', 'n/a', '25'],
+    })
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'n': range(45), 'group': ['a', 'b', 'c'] * 15}).to_csv(path, index=False)
+    return path
+
+
+def names(frame, filter_query):
+    return frame['name'][_filter_mask(frame, parse_filter(filter_query))].tolist()
+
+
+@pytest.mark.parametrize(('filter_query', 'expected'), (
+    ('{age} > 40', [('age', 'gt', 40.0, True)]),
+    ('{age} s>= 40', [('age', 'ge', 40.0, True)]),
+    ('{name} icontains agin', [('name', 'contains', 'agin', False)]),
+    ('{name} scontains Agin', [('name', 'contains', 'Agin', True)]),
+    ('{name} = "Bay Street"', [('name', 'eq', 'Bay Street', True)]),
+    ("{name} = 'it\\'s'", [('name', 'eq', "it's", True)]),
+    ('{count} = "10"', [('count', 'eq', '10', True)]),
+    ('{age} > 30 && {name} contains a', [('age', 'gt', 30.0, True), ('name', 'contains', 'a', True)]),
+    ('{age} bogus 3 && not a filter', []),
+    ('', []),
+))
+def test_parse_filter(filter_query, expected):
+    assert parse_filter(filter_query) == expected
+
+
+def test_case_prefixes(frame):
+    assert names(frame, '{name} scontains Agin') == ['Agincourt']
+    assert names(frame, '{name} icontains AGIN') == ['Agincourt', 'agincourt south']
+    assert names(frame, '{name} ieq "agincourt"') == ['Agincourt']
+    assert names(frame, '{name} seq "agincourt"') == []
+
+
+def test_numeric_and_text_columns(frame):
+    assert names(frame, '{age} > 40') == ['Agincourt', 'Casa Loma', None]
+    # Text columns are compared as numbers when the value is a number,
+    # and unparseable cells never match
+    assert names(frame, '{count} >= 25') == ['agincourt south', None]
+    # A quoted value compares as text, even against a numeric column
+    assert names(frame, '{age} = "31.0"') == ['Bay Street']
+
+
+def test_and_chain(frame):
+    assert names(frame, '{age} > 35 && {name} icontains a && {count} < 100') == ['Agincourt']
+
+
+def test_unknown_column_is_ignored(frame):
+    assert len(names(frame, '{missing} > 1')) == len(frame)
+
+
+def test_query_page(dataset):
+    records, page_count, page = query_page(dataset, 1, 10, [{'column_id': 'n', 'direction': 'desc'}])
+    assert (page_count, page) == (5, 1)
+    assert [r['n'] for r in records] == list(range(34, 24, -1))
+
+
+def test_query_page_clamps_to_last_page(dataset):
+    # Viewing page 5, then a filter leaves only 15 rows: 2 pages of 10
+    records, page_count, page = query_page(dataset, 4, 10, [], '{group} = a')
+    assert (page_count, page) == (2, 1)
+    assert [r['n'] for r in records] == [30, 33, 36, 39, 42]
+
+    records, page_count, page = query_page(dataset, 4, 10, [], '{group} = z')
+    assert (records, page_count, page) == ([], 1, 0)
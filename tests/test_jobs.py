@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import diskcache
+import pytest
+
+import jobs
+from jobs import run_deduplicated
+
+KEY = ('test', 1)
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    cache = diskcache.Cache(tmp_path / 'jobs')
+    monkeypatch.setattr(jobs, 'cache', cache)
+    yield cache
+    cache.close()
+
+
+def counting_job(calls, seconds=0.0, result=42):
+    def job(progress):
+        calls.append(threading.get_ident())
+        for done in range(1, 4):
+            time.sleep(seconds / 3)
+            progress(done, 3)
+        return result
+    return job
+
+
+def test_concurrent_callers_share_one_run():
+    calls = []
+    job = counting_job(calls, seconds=0.3)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(run_deduplicated(KEY, job, poll=0.01)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * 4
+    assert len(calls) == 1
+
+
+def test_finished_result_is_reused():
+    calls = []
+    assert run_deduplicated(KEY, counting_job(calls)) == 42
+    assert run_deduplicated(KEY, counting_job(calls, result=0)) == 42
+    assert len(calls) == 1
+    # A different key is a different job
+    assert run_deduplicated(('test', 2), counting_job(calls, result=7)) == 7
+
+
+def test_waiter_sees_progress(cache):
+    cache.set(('running',) + KEY, (os.getpid(), 'other'))
+    cache.set(('progress',) + KEY, (5, 10))
+    seen = []
+
+    def finish():
+        time.sleep(0.1)
+        cache.set(('result',) + KEY, 'done')
+        cache.delete(('running',) + KEY)
+
+    threading.Thread(target=finish).start()
+    assert run_deduplicated(KEY, counting_job([]), progress=lambda *p: seen.append(p), poll=0.01) == 'done'
+    assert seen and seen[0] == (5, 10)
+
+
+def test_takeover_after_owner_exits(cache):
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    cache.set(('running',) + KEY, (process.pid, 'dead'))
+
+    calls = []
+    assert run_deduplicated(KEY, counting_job(calls), poll=0.01) == 42
+    assert len(calls) == 1
+
+
+def test_takeover_after_owner_becomes_zombie(cache):
+    # Killed but not reaped, as when a cancel lands in another worker
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    process.kill()
+    deadline = time.monotonic() + 5
+    while jobs.psutil.Process(process.pid).status() != jobs.psutil.STATUS_ZOMBIE:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    cache.set(('running',) + KEY, (process.pid, 'zombie'))
+
+    calls = []
+    try:
+        assert run_deduplicated(KEY, counting_job(calls), poll=0.01) == 42
+    finally:
+        process.wait()
+    assert len(calls) == 1
+
+
+def test_takeover_after_owner_stalls(cache):
+    # The owner is alive but has stopped reporting progress
+    cache.set(('running',) + KEY, (os.getpid(), 'stalled'))
+
+    calls = []
+    start = time.monotonic()
+    assert run_deduplicated(KEY, counting_job(calls), poll=0.01, stall_timeout=0.2) == 42
+    assert len(calls) == 1
+    assert time.monotonic() - start < 5
@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from flaskr.db import get_db
+from flaskr.laundry import RequestBatcher
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', 'flaskr', 'schema.sql')
+
+
+def create_database(path, users=1):
+    with open(SCHEMA_PATH) as f:
+        schema = f.read()
+    db = sqlite3.connect(path)
+    db.executescript(schema)
+    db.executemany(
+        'INSERT INTO user (username, password) VALUES (?, ?)',
+        [(f'user{i}', 'x') for i in range(users)]
+    )
+    db.commit()
+    db.close()
+
+
+def submit_together(batcher, requests):
+    """Submit (user_id, machine_id) pairs from one thread each, all at once."""
+    barrier = threading.Barrier(len(requests))
+    results = [None] * len(requests)
+
+    def submit(i, user_id, machine_id):
+        barrier.wait()
+        try:
+            results[i] = batcher.submit(user_id, machine_id)
+        except Exception as e:
+            results[i] = e
+
+    threads = [
+        threading.Thread(target=submit, args=(i, user_id, machine_id))
+        for i, (user_id, machine_id) in enumerate(requests)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.fixture
+def worker_app(app):
+    app.config['LAUNDRY_WORKER_TOKENS'] = {'secret': 'washer'}
+    return app
+
+
+def login(client):
+    client.post('/auth/login', data={'username': 'test', 'password': 'test'})
+
+
+def test_claim_requires_token(worker_app, client):
+    login(client)
+    client.post('/laundry/machines/m1/requests')
+
+    assert client.post('/laundry/machines/m1/claim').status_code == 401
+    response = client.post(
+        '/laundry/machines/m1/claim', headers={'Authorization': 'Bearer wrong'}
+    )
+    assert response.status_code == 401
+    assert client.get('/laundry/machines/m1/depth').get_json()['depth'] == 1
+
+
+def test_claim(worker_app, client):
+    login(client)
+    created = client.post('/laundry/machines/m1/requests').get_json()
+    headers = {'Authorization': 'Bearer secret'}
+
+    response = client.post('/laundry/machines/m1/claim', headers=headers)
+    assert response.get_json()['id'] == created['id']
+    assert client.post('/laundry/machines/m1/claim', headers=headers).status_code == 204
+
+
+def test_batcher_coalesces_submits(tmp_path):
+    path = tmp_path / 'laundry.sqlite'
+    create_database(path)
+    batcher = RequestBatcher(str(path), max_wait=0.2)
+    batch_sizes = []
+    insert = batcher._insert
+    batcher._insert = lambda db, batch: batch_sizes.append(len(batch)) or insert(db, batch)
+
+    ids = submit_together(batcher, [(1, 'm1')] * 10)
+    assert sorted(ids) == list(range(1, 11))
+    assert batch_sizes == [10]
+
+
+def test_batcher_bad_row_fails_alone(tmp_path):
+    path = tmp_path / 'laundry.sqlite'
+    create_database(path)
+    batcher = RequestBatcher(str(path), {'foreign_keys': 'ON'}, max_wait=0.2)
+
+    results = submit_together(batcher, [(1, 'm1'), (99, 'm1'), (1, 'm2')])
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert sorted([results[0], results[2]]) == [1, 2]
+
+
+def test_batcher_survives_errors(tmp_path):
+    # The database can't be opened yet, so the first batch fails without
+    # killing the writer, and later requests succeed once it exists
+    path = tmp_path / 'missing' / 'laundry.sqlite'
+    batcher = RequestBatcher(str(path), timeout=5)
+    with pytest.raises(sqlite3.OperationalError):
+        batcher.submit(1, 'm1')
+
+    os.makedirs(path.parent)
+    create_database(path)
+    assert batcher.submit(1, 'm1') == 1
+
+
+def test_batcher_timeout(tmp_path):
+    batcher = RequestBatcher(str(tmp_path / 'laundry.sqlite'), max_wait=1, timeout=0.05)
+    with pytest.raises(TimeoutError):
+        batcher.submit(1, 'm1')
+
+
+def test_concurrent_claims_are_unique(worker_app):
+    worker_app.config['LAUNDRY_WORKER_TOKENS'] = {f'token{i}': f'worker{i}' for i in range(4)}
+    with worker_app.app_context():
+        db = get_db()
+        db.executemany(
+            'INSERT INTO laundry_requests (user_id, machine_id) VALUES (1, ?)',
+            [('m1',)] * 100
+        )
+        db.commit()
+
+    claimed = {}
+
+    def work(i):
+        client = worker_app.test_client()
+        ids = claimed[i] = []
+        while True:
+            response = client.post(
+                '/laundry/machines/m1/claim', headers={'Authorization': f'Bearer token{i}'}
+            )
+            if response.status_code == 204:
+                return
+            ids.append(response.get_json()['id'])
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [request_id for worker_ids in claimed.values() for request_id in worker_ids]
+    assert len(ids) == 100
+    assert len(set(ids)) == 100
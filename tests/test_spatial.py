@@ -0,0 +1,47 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely import box
+
+from spatial import contiguity_weights, morans_i
+
+
+@pytest.fixture
+def grid():
+    """A 6 x 6 grid of unit squares, row by row."""
+    return gpd.GeoDataFrame(geometry=[box(x, y, x + 1, y + 1) for y in range(6) for x in range(6)])
+
+
+def test_contiguity_weights(grid):
+    weights = contiguity_weights(grid)
+    # Queen contiguity: a corner cell touches 3 cells, an inner one 8
+    assert np.count_nonzero(weights[0]) == 3
+    assert np.count_nonzero(weights[7]) == 8
+    assert np.allclose(weights.sum(axis=1), 1.0)
+    assert np.all(np.diag(weights) == 0)
+
+
+def test_morans_i_gradient(grid):
+    values = np.repeat(np.arange(6.0), 6)
+    result = morans_i(values, contiguity_weights(grid), permutations=999)
+    assert result['I'] > 0.5
+    assert result['p_value'] == pytest.approx(1 / 1000)
+    assert result['expected'] == pytest.approx(-1 / 35)
+
+
+def test_morans_i_random_is_not_significant(grid):
+    weights = contiguity_weights(grid)
+    p_values = [
+        morans_i(np.random.default_rng(seed).normal(size=36), weights, permutations=199, seed=seed)['p_value']
+        for seed in range(50)
+    ]
+    # Under no autocorrelation p is roughly uniform
+    assert 0.35 < np.mean(p_values) < 0.65
+
+
+def test_morans_i_ignores_missing(grid):
+    values = np.repeat(np.arange(6.0), 6)
+    values[[3, 20]] = np.nan
+    result = morans_i(values, contiguity_weights(grid), permutations=99)
+    assert np.isfinite(result['I'])
+    assert result['expected'] == pytest.approx(-1 / 33)